@@ -32,6 +32,8 @@ export type Profiles = { [profile: Profile]: Config };
 export type GlobalConfig = {
   config_dir: string;
   auto_update_check: boolean;
+  stream_extraction: boolean;
+  http_cache_max_size_mib: number;
   cache_dir: string;
   access_tokens: {
     cfcore: string | null;
@@ -125,6 +127,7 @@ export type AddonMatch = {
 };
 
 export enum ReconciliationStage {
+  cf_fingerprints = "cf_fingerprints",
   toc_source_ids = "toc_source_ids",
   folder_name_subsets = "folder_name_subsets",
   addon_names_with_folder_names = "addon_names_with_folder_names",
@@ -31,6 +31,7 @@ from instawow._logging import logger
 from instawow._utils.aio import cancel_tasks, run_in_thread
 from instawow._utils.attrs import evolve
 from instawow._utils.iteration import WeakValueDefaultDictionary, uniq
+from instawow.catalogue import keep_warm as keep_catalogue_warm
 from instawow.catalogue.cataloguer import CatalogueEntry
 from instawow.catalogue.search import search as search_catalogue
 from instawow.config import GlobalConfig, ProfileConfig, SecretStr, config_converter
@@ -91,6 +92,23 @@ class _JsonRpcError(TypedDict):
     data: NotRequired[list[Any]]
 
 
+class _JsonRpcNotification[MethodT: str, ParamsT](TypedDict):
+    jsonrpc: Literal['2.0']
+    method: MethodT
+    params: ParamsT
+
+
+type _Notify = Callable[[str, object], Awaitable[None]]
+
+_notify_var = contextvars.ContextVar[_Notify]('_notify_var')
+_search_subscriptions_var = contextvars.ContextVar[dict[str, asyncio.Task[None]]](
+    '_search_subscriptions_var'
+)
+
+_SEARCH_DEBOUNCE_DELAY = 0.15
+_QUICK_SEARCH_LIMIT = 10
+
+
 type _MethodResponder = Callable[..., Awaitable[object]]
 
 _methods = dict[str, tuple[type[_JsonRpcRequest[Any, Any]], _MethodResponder]]()
@@ -236,6 +254,70 @@ async def search_pkgs(
         )
 
 
+@_register_method('search/subscribe')
+async def subscribe_to_search(
+    profile: str,
+    subscription_id: str,
+    search_terms: str,
+    limit: int,
+    sources: set[str],
+    start_date: datetime | None,
+    installed_only: bool,
+) -> None:
+    notify = _notify_var.get()
+    subscriptions = _search_subscriptions_var.get()
+
+    async def search_debounced():
+        await asyncio.sleep(_SEARCH_DEBOUNCE_DELAY)
+
+        async def search_and_notify(limit_: int, quick: bool):
+            results = await search_catalogue(
+                search_terms,
+                limit=limit_,
+                sources=sources,
+                start_date=start_date,
+                filter_installed='include_only' if installed_only else 'ident',
+                quick=quick,
+            )
+            await notify(
+                'search/results',
+                {
+                    'subscription_id': subscription_id,
+                    'search_terms': search_terms,
+                    'results': results,
+                    'final': not quick,
+                },
+            )
+
+        try:
+            async with _load_profile(profile):
+                # Push a quick first page of results before the full result set.
+                if limit > _QUICK_SEARCH_LIMIT:
+                    await search_and_notify(_QUICK_SEARCH_LIMIT, quick=True)
+
+                await search_and_notify(limit, quick=False)
+        except Exception:
+            logger.exception('Search failed')
+
+    def remove_subscription(task: asyncio.Task[None]):
+        if subscriptions.get(subscription_id) is task:
+            del subscriptions[subscription_id]
+
+    superseded_task = subscriptions.get(subscription_id)
+    if superseded_task:
+        superseded_task.cancel()
+
+    task = subscriptions[subscription_id] = asyncio.create_task(search_debounced())
+    task.add_done_callback(remove_subscription)
+
+
+@_register_method('search/unsubscribe')
+async def unsubscribe_from_search(subscription_id: str) -> None:
+    task = _search_subscriptions_var.get().pop(subscription_id, None)
+    if task:
+        task.cancel()
+
+
 @_register_method('resolve')
 async def resolve_pkgs(
     profile: str, defns: list[Defn]
@@ -653,7 +735,11 @@ async def create_web_app(toga_handle: toga.App | None = None):
             global_config = await _read_global_config()
 
             web_client = await exit_stack.enter_async_context(
-                init_web_client(global_config.dirs.cache, with_progress=True)
+                init_web_client(
+                    global_config.dirs.cache,
+                    with_progress=True,
+                    max_cache_size=global_config.http_cache_max_size_mib * 2**20,
+                )
             )
             ctx.http.web_client.set(web_client)
 
@@ -661,6 +747,8 @@ async def create_web_app(toga_handle: toga.App | None = None):
                 make_progress_receiver[PkgDownloadProgress]()
             )
 
+            await exit_stack.enter_async_context(keep_catalogue_warm())
+
             github_auth_manager = await exit_stack.enter_async_context(_GitHubAuthManager())
 
             if toga_handle:
@@ -771,10 +859,23 @@ async def create_web_app(toga_handle: toga.App | None = None):
             )
             await websocket.send_json(response)
 
+        async def notify(method: str, params: object):
+            notification = _JsonRpcNotification(
+                jsonrpc='2.0',
+                method=method,
+                params=_converter.unstructure(params),
+            )
+            await websocket.send_json(notification)
+
         websocket = aiohttp.web.WebSocketResponse()
         await websocket.prepare(request)
         websockets.add(websocket)
 
+        _notify_var.set(notify)
+
+        search_subscriptions = dict[str, asyncio.Task[None]]()
+        _search_subscriptions_var.set(search_subscriptions)
+
         tasks = set[asyncio.Task[object]]()  # To avoid tasks getting lost in the aether.
 
         async for msg in websocket:
@@ -783,6 +884,8 @@ async def create_web_app(toga_handle: toga.App | None = None):
                 tasks.add(task)
                 task.add_done_callback(tasks.remove)
 
+        await cancel_tasks(list(search_subscriptions.values()))
+
         return websocket
 
     @aiohttp.web.middleware
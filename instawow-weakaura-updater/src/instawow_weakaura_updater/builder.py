@@ -26,7 +26,7 @@ from instawow.wow_installations import (
 from ._utils import get_checksum
 from .config import PluginConfig
 
-_saved_vars_cache_name = '_saved_vars_v1'
+_saved_vars_cache_name = '_saved_vars_v2'
 
 _api_base_url = URL('https://data.wago.io/api')
 
@@ -338,7 +338,7 @@ async def build_addon(plugin_config: PluginConfig) -> _BuildPaths:
 def extract_installed_auras(
     plugin_config: PluginConfig,
 ) -> Iterator[tuple[str, _AuraAddon, _AuraGroup]]:
-    import diskcache
+    import shelve
 
     installation_dir = extract_installation_dir_from_addon_dir(
         plugin_config.profile_config.addon_dir
@@ -348,9 +348,9 @@ def extract_installed_auras(
             f'Cannot determine installation folder from {plugin_config.profile_config.addon_dir}'
         )
 
-    with diskcache.Cache(
-        plugin_config.dirs.cache / _saved_vars_cache_name,
-    ) as cache:
+    plugin_config.dirs.cache.mkdir(parents=True, exist_ok=True)
+
+    with shelve.open(plugin_config.dirs.cache / _saved_vars_cache_name) as cache:
         for account_sv_path, addon in product(
             installation_dir.glob('WTF/Account/*/SavedVariables'), (_WeakAuras, _Plateroos)
         ):
@@ -362,13 +362,12 @@ def extract_installed_auras(
                 continue
 
             content = sv_path.read_text(encoding='utf-8-sig', errors='replace')
-            checksum_key = f'saved_vars_checksum__{sv_path}'
             checksum = get_checksum(content)
-            auras_key = f'saved_vars_auras__{sv_path}'
 
-            if cache.get(checksum_key) == checksum:
+            cached_checksum, cached_auras = cache.get(str(sv_path), (None, None))
+            if cached_checksum == checksum:
                 logger.info(f'Loading auras from cache for {sv_path!r}')
-                auras = cache[auras_key]
+                auras = cached_auras
             else:
                 with time_op(
                     lambda t: logger.debug(
@@ -379,9 +378,7 @@ def extract_installed_auras(
 
                     auras = addon.extract_auras(_custom_slpp.loads(f'{{ {content} }}'))
 
-                with cache.transact():
-                    cache[checksum_key] = checksum
-                    cache[auras_key] = auras
+                cache[str(sv_path)] = (checksum, auras)
 
             yield account_sv_path.parent.name, addon, auras
 
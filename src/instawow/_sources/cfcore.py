@@ -1,10 +1,11 @@
 from __future__ import annotations
 
 import os
-from collections.abc import Sequence
+from collections.abc import Sequence, Set
 from datetime import datetime, timedelta
 from enum import IntEnum
 from functools import partial
+from itertools import batched, takewhile
 from typing import NotRequired
 
 from typing_extensions import TypedDict
@@ -27,6 +28,8 @@ from ..wow_installations import Flavour, to_flavourful_enum
 
 _CF_WOW_GAME_ID = 1
 
+_RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
 
 class _CfCoreModLinks(TypedDict):
     websiteUrl: str
@@ -114,6 +117,12 @@ class _CfCoreHashAlgo(IntEnum):
     Md5 = 2
 
 
+_CF_CORE_HASH_ALGO_NAMES = {
+    _CfCoreHashAlgo.Sha1: 'sha1',
+    _CfCoreHashAlgo.Md5: 'md5',
+}
+
+
 class _CfCoreFileHash(TypedDict):
     value: str
     algo: _CfCoreHashAlgo
@@ -209,6 +218,22 @@ class _CfCoreMod(TypedDict):
     allowModDistribution: bool | None
 
 
+class _CfCoreFingerprintMatch(TypedDict):
+    id: int
+    file: _CfCoreFile
+    latestFiles: list[_CfCoreFile]
+
+
+class _CfCoreFingerprintsMatchesResult(TypedDict):
+    isCacheBuilt: bool
+    exactMatches: list[_CfCoreFingerprintMatch]
+    exactFingerprints: list[int]
+    partialMatches: list[_CfCoreFingerprintMatch]
+    partialMatchFingerprints: dict[str, list[int]]
+    installedFingerprints: list[int]
+    unmatchedFingerprints: list[int]
+
+
 class _CfCoreModsSearchSortField(IntEnum):
     Featured = 1
     Popularity = 2
@@ -263,7 +288,9 @@ class CfCoreResolver(BaseResolver[_CfCoreMod]):
     )
 
     # Ref: https://docs.curseforge.com/
-    __mod_api_url = URL(_alternative_api_url or 'https://api.curseforge.com/v1').joinpath('mods')
+    __api_url = URL(_alternative_api_url or 'https://api.curseforge.com/v1')
+    __mod_api_url = __api_url.joinpath('mods')
+    __fingerprints_api_url = __api_url.joinpath('fingerprints', str(_CF_WOW_GAME_ID))
 
     @AccessToken
     def access_token():
@@ -447,8 +474,43 @@ class CfCoreResolver(BaseResolver[_CfCoreMod]):
                 for d in file['dependencies']
                 if d['relationType'] == _CfCoreFileRelationType.RequiredDependency
             ],
+            hashes={
+                n: h['value']
+                for h in file['hashes']
+                for n in (_CF_CORE_HASH_ALGO_NAMES.get(h['algo']),)
+                if n
+            },
         )
 
+    async def get_fingerprint_matches(self, fingerprints: Set[int]) -> dict[int, str]:
+        """Map add-on folder fingerprints to the IDs of the mods they were released with.
+
+        API errors are logged and leave every fingerprint unmatched.
+        """
+        from aiohttp import ClientResponseError
+
+        try:
+            async with ctx.http.web_client().post(
+                self.__fingerprints_api_url,
+                expire_after=timedelta(minutes=5),
+                headers=self.make_request_headers(),
+                json={'fingerprints': sorted(fingerprints)},
+                raise_for_status=True,
+            ) as response:
+                response_json: _CfCoreDataResponse[
+                    _CfCoreFingerprintsMatchesResult
+                ] = await response.json()
+        except ClientResponseError as error:
+            logger.warning(f'Unable to match fingerprints: {error.status} {error.message}')
+            return {}
+
+        return {
+            m['fingerprint']: str(r['id'])
+            for r in response_json['data']['exactMatches']
+            for m in r['file']['modules']
+            if m['fingerprint'] in fingerprints
+        }
+
     async def get_changelog(self, url: str):
         async with ctx.http.web_client().get(
             url,
@@ -460,7 +522,9 @@ class CfCoreResolver(BaseResolver[_CfCoreMod]):
             return response_json['data']
 
     async def catalogue(self):
-        from aiohttp import ClientTimeout
+        import asyncio
+
+        from aiohttp import ClientError, ClientResponseError, ClientTimeout
 
         supported_flavours = [
             (f, to_flavourful_enum(f, _CfCoreSortableGameVersionTypeId)) for f in Flavour
@@ -482,6 +546,8 @@ class CfCoreResolver(BaseResolver[_CfCoreMod]):
 
         STEP = 50
         MAX_OFFSET = 10_000  # The CF API craps out after 9,999 results
+        MAX_CONCURRENT_PAGES = 10
+        MAX_ATTEMPTS = 5
 
         get = partial(
             ctx.http.web_client().get,
@@ -492,7 +558,7 @@ class CfCoreResolver(BaseResolver[_CfCoreMod]):
         if access_token:
             get = partial(get, headers={'x-api-key': access_token})
 
-        for offset in range(0, MAX_OFFSET, STEP):
+        async def get_page(offset: int) -> list[_CfCoreMod]:
             url = (self.__mod_api_url / 'search').with_query(
                 gameId=_CF_WOW_GAME_ID,
                 sortField=_CfCoreModsSearchSortField.LastUpdated,
@@ -502,23 +568,40 @@ class CfCoreResolver(BaseResolver[_CfCoreMod]):
             )
             logger.debug(f'Retrieving {url}')
 
-            for attempt in range(3):
+            for attempt in range(MAX_ATTEMPTS):
+                if attempt:
+                    await asyncio.sleep(2**attempt)
+
                 try:
                     async with get(url) as response:
                         response_json: _CfCorePaginatedDataResponse[
                             list[_CfCoreMod]
                         ] = await response.json()
-                        break
-                except TimeoutError:
-                    logger.debug(f'Request timed out; attempt {attempt + 1} of 3')
-            else:
-                raise RuntimeError('Maximum number of attempts exceeded')
+                        return response_json['data']
+                except (ClientError, TimeoutError) as error:
+                    if (
+                        isinstance(error, ClientResponseError)
+                        and error.status not in _RETRYABLE_STATUSES
+                    ):
+                        raise
+
+                    logger.debug(
+                        f'Request failed with {error!r}; attempt {attempt + 1} of {MAX_ATTEMPTS}'
+                    )
 
-            items = response_json['data']
-            if not items:
-                break
+            raise RuntimeError('Maximum number of attempts exceeded')
+
+        # Mods can shift between pages while the catalogue is being crawled.
+        seen_ids = set[int]()
+
+        for offsets in batched(range(0, MAX_OFFSET, STEP), MAX_CONCURRENT_PAGES):
+            pages = await gather(get_page(o) for o in offsets)
 
-            for item in items:
+            for item in (i for p in takewhile(bool, pages) for i in p):
+                if item['id'] in seen_ids:
+                    continue
+
+                seen_ids.add(item['id'])
                 yield CatalogueEntryCandidate(
                     id=str(item['id']),
                     slug=item['slug'],
@@ -529,3 +612,6 @@ class CfCoreResolver(BaseResolver[_CfCoreMod]):
                     last_updated=datetime.fromisoformat(item['dateReleased']),
                     folders=excise_folders(item['latestFiles']),
                 )
+
+            if not all(pages):
+                break
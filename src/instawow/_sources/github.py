@@ -286,8 +286,8 @@ class GithubResolver(BaseResolver):
                     addon_zip_stream.seek(main_toc_file_offset)
                     addon_zip_stream.write(await toc_file_range_response.read())
 
-            toc_content = dynamic_addon_zip.read(main_toc_filename)
-            toc_reader = TocReader.from_bytes(toc_content)
+            with dynamic_addon_zip.open(main_toc_filename) as toc_file:
+                toc_reader = TocReader.from_file(toc_file)
 
             logger.debug(
                 f'Found interface versions {toc_reader.interfaces!r} in {main_toc_filename}'
@@ -148,6 +148,7 @@ class WowiResolver(BaseResolver[_WowiDetailsApiItem]):
             date_published=_timestamp_to_datetime(metadata['UIDate']),
             version=metadata['UIVersion'],
             changelog_url=as_plain_text_data_url(metadata['UIChangeLog']),
+            hashes={'md5': metadata['UIMD5']} if metadata['UIMD5'] else {},
         )
 
     async def catalogue(self):
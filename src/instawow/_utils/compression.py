@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+import sys
+from types import ModuleType
+
+zstd: ModuleType | None
+
+if sys.version_info >= (3, 14):
+    from compression import zstd
+else:
+    try:
+        from backports import zstd
+    except ImportError:
+        zstd = None
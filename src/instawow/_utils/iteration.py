@@ -39,18 +39,32 @@ def fill[T](it: Iterable[T], fill: T, length: int) -> Iterable[T]:
 
 
 def merge_intersecting_sets[T](it: Iterable[Set[T]]) -> Iterator[frozenset[T]]:
-    "Recursively merge intersecting sets in a collection."
+    "Merge intersecting sets in a collection, in order of first appearance."
     many_sets = list(map(frozenset, it))
-    while many_sets:
-        this_set = many_sets.pop(0)
-        while True:
-            for idx, other_set in enumerate(many_sets):
-                if not this_set.isdisjoint(other_set):
-                    this_set |= many_sets.pop(idx)
-                    break
-            else:
-                break
-        yield this_set
+
+    # Disjoint-set forest over set indices; roots are always the lowest index in their tree.
+    parents = list(range(len(many_sets)))
+
+    def find(idx: int):
+        while parents[idx] != idx:
+            parents[idx] = idx = parents[parents[idx]]
+        return idx
+
+    first_set_idxs = dict[T, int]()
+    for idx, this_set in enumerate(many_sets):
+        for element in this_set:
+            other_idx = first_set_idxs.setdefault(element, idx)
+            if other_idx != idx:
+                this_root, other_root = find(idx), find(other_idx)
+                if this_root != other_root:
+                    parents[max(this_root, other_root)] = min(this_root, other_root)
+
+    merged_sets = dict[int, list[frozenset[T]]]()
+    for idx, this_set in enumerate(many_sets):
+        merged_sets.setdefault(find(idx), []).append(this_set)
+
+    for sets in merged_sets.values():
+        yield frozenset().union(*sets)
 
 
 def uniq[HashableT: Hashable](it: Iterable[HashableT]) -> list[HashableT]:
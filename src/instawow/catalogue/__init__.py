@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import contextvars as cv
 import datetime as dt
 import json
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from functools import lru_cache
 
 from .. import ctx
 from .._logging import logger
+from .._utils.aio import run_in_thread
 from .._utils.perf import time_op
 from ..progress_reporting import make_download_progress
 from . import cataloguer
@@ -18,28 +22,105 @@ _base_catalogue_url = (
 )
 _catalogue_ttl = dt.timedelta(hours=4)
 
+# The warm catalogue is refreshed once 90% of its TTL has elapsed.
+_CATALOGUE_REFRESH_LEAD_TIME = _catalogue_ttl / 10
+_MIN_CATALOGUE_REFRESH_INTERVAL = dt.timedelta(minutes=1)
+
 
 @lru_cache(1)
 def _parse_catalogue(raw_catalogue: bytes):
     with time_op(lambda t: logger.debug(f'Parsed catalogue in {t:.3f}s')):
-        return cataloguer.ComputedCatalogue.from_base_catalogue(
+        catalogue = cataloguer.ComputedCatalogue.from_base_catalogue(
             json.loads(raw_catalogue),
         )
+        # Build the search and matching indices off-loop.
+        catalogue.normalised_name_trigrams  # noqa: B018
+        catalogue.folder_names_by_flavour  # noqa: B018
+        return catalogue
+
+
+async def _load_catalogue(
+    *, refresh: bool = False
+) -> tuple[cataloguer.ComputedCatalogue, dt.datetime]:
+    "Load the catalogue and return it with the expiry of the cached copy."
+    from aiohttp_client_cache.response import CachedResponse
+
+    async with ctx.http.web_client().get(
+        _base_catalogue_url,
+        expire_after=_catalogue_ttl,
+        refresh=refresh,
+        raise_for_status=True,
+        trace_request_ctx={'progress': make_download_progress(label='Synchronising catalogue')},
+    ) as response:
+        if isinstance(response, CachedResponse) and response.expires is not None:
+            expires = response.expires.replace(tzinfo=dt.UTC)
+        else:
+            expires = dt.datetime.now(dt.UTC) + _catalogue_ttl
+
+        raw_catalogue = await response.read()
+
+    return (await run_in_thread(_parse_catalogue)(raw_catalogue), expires)
+
+
+class _WarmCatalogue:
+    catalogue: cataloguer.ComputedCatalogue | None = None
+
+
+_warm_catalogue_var = cv.ContextVar[_WarmCatalogue | None]('_warm_catalogue_var', default=None)
 
 
 async def synchronise() -> cataloguer.ComputedCatalogue:
     "Fetch the catalogue from the interwebs and load it."
-    async with (
-        ctx.sync.locks()[_LOAD_CATALOGUE_LOCK],
-        ctx.http.web_client().get(
-            _base_catalogue_url,
-            expire_after=_catalogue_ttl,
-            raise_for_status=True,
-            trace_request_ctx={
-                'progress': make_download_progress(label='Synchronising catalogue')
-            },
-        ) as response,
-    ):
-        raw_catalogue = await response.read()
+    warm_catalogue = _warm_catalogue_var.get()
+    if warm_catalogue is not None and warm_catalogue.catalogue is not None:
+        return warm_catalogue.catalogue
+
+    async with ctx.sync.locks()[_LOAD_CATALOGUE_LOCK]:
+        if warm_catalogue is not None and warm_catalogue.catalogue is not None:
+            return warm_catalogue.catalogue
+
+        catalogue, _ = await _load_catalogue()
+        if warm_catalogue is not None:
+            warm_catalogue.catalogue = catalogue
+
+    return catalogue
+
+
+@asynccontextmanager
+async def keep_warm() -> AsyncIterator[None]:
+    """Pre-load the catalogue in the background and refresh it ahead of expiry.
+
+    The previous catalogue continues to be served while it is being refreshed.
+    """
+    import asyncio
+
+    from .._utils.aio import cancel_tasks
+
+    warm_catalogue = _WarmCatalogue()
+
+    async def refresh_periodically():
+        while True:
+            refresh_interval = _MIN_CATALOGUE_REFRESH_INTERVAL
+            try:
+                async with ctx.sync.locks()[_LOAD_CATALOGUE_LOCK]:
+                    warm_catalogue.catalogue, expires = await _load_catalogue(
+                        refresh=warm_catalogue.catalogue is not None
+                    )
+            except Exception:
+                logger.exception('Unable to refresh catalogue')
+            else:
+                refresh_interval = max(
+                    expires - _CATALOGUE_REFRESH_LEAD_TIME - dt.datetime.now(dt.UTC),
+                    refresh_interval,
+                )
+
+            await asyncio.sleep(refresh_interval.total_seconds())
+
+    token = _warm_catalogue_var.set(warm_catalogue)
 
-    return _parse_catalogue(raw_catalogue)
+    refresh_task = asyncio.create_task(refresh_periodically())
+    try:
+        yield
+    finally:
+        await cancel_tasks([refresh_task])
+        _warm_catalogue_var.reset(token)
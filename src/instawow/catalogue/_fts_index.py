@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import sqlite3
+from collections.abc import Iterator
+from contextlib import closing, contextmanager
+from functools import cache
+from pathlib import Path
+
+from .._logging import logger
+from .._utils.perf import time_op
+from .._utils.text import normalise_names
+from .cataloguer import CatalogueEntry, ComputedCatalogue
+
+FTS_INDEX_NAME = '_catalogue_fts_v1.sqlite'
+
+# One weight per column in the order they are declared in.
+_BM25_WEIGHTS = ', '.join(map(str, [0.0, 0.0, 10.0, 5.0, 1.0]))
+
+_tokenise = normalise_names(' ')
+
+
+@cache
+def is_fts5_available() -> bool:
+    with closing(sqlite3.connect(':memory:')) as connection:
+        try:
+            connection.execute('CREATE VIRTUAL TABLE fts5_test USING fts5(value)')
+        except sqlite3.OperationalError:
+            return False
+        else:
+            return True
+
+
+@contextmanager
+def _connect(index_path: Path) -> Iterator[sqlite3.Connection]:
+    with closing(sqlite3.connect(index_path, isolation_level=None)) as connection:
+        connection.execute(
+            """\
+            CREATE VIRTUAL TABLE IF NOT EXISTS entry USING fts5(
+                source UNINDEXED,
+                id UNINDEXED,
+                name,
+                slug,
+                folders,
+                prefix = '2 3',
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+            """
+        )
+        yield connection
+
+
+def _make_indexed_values(entry: CatalogueEntry):
+    return (entry.name, entry.slug, ' '.join(sorted({f for s in entry.folders for f in s})))
+
+
+def update_index(index_path: Path, catalogue: ComputedCatalogue) -> None:
+    "Bring the index in line with the catalogue, only touching entries which have changed."
+    new_values = {(e.source, e.id): _make_indexed_values(e) for e in catalogue.entries}
+
+    with (
+        time_op(lambda t: logger.debug(f'Updated catalogue full-text index in {t:.3f}s')),
+        _connect(index_path) as connection,
+    ):
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            stale_rowids = list[tuple[int]]()
+            for rowid, source, id, *values in connection.execute(
+                'SELECT rowid, source, id, name, slug, folders FROM entry'
+            ):
+                if new_values.get((source, id)) == tuple(values):
+                    del new_values[source, id]
+                else:
+                    stale_rowids.append((rowid,))
+
+            connection.executemany('DELETE FROM entry WHERE rowid = ?', stale_rowids)
+            connection.executemany(
+                'INSERT INTO entry (source, id, name, slug, folders) VALUES (?, ?, ?, ?, ?)',
+                ((*k, *v) for k, v in new_values.items()),
+            )
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        else:
+            connection.execute('COMMIT')
+
+
+def query_index(
+    index_path: Path, search_terms: str, limit: int
+) -> list[tuple[tuple[str, str], float]]:
+    "Retrieve the keys of matching entries together with their BM25 score, best first."
+    tokens = _tokenise(search_terms).split()
+    if not tokens:
+        return []
+
+    # Every token is treated as a prefix so that partial words will match.
+    match_expression = ' '.join(f'"{t}"*' for t in tokens)
+
+    with _connect(index_path) as connection:
+        return [
+            ((source, id), -rank)
+            for source, id, rank in connection.execute(
+                f"""\
+                SELECT source, id, bm25(entry, {_BM25_WEIGHTS}) AS rank
+                FROM entry
+                WHERE entry MATCH ?
+                ORDER BY rank
+                LIMIT ?
+                """,
+                (match_expression, limit),
+            )
+        ]
@@ -1,21 +1,33 @@
 from __future__ import annotations
 
-from collections.abc import Set
-from datetime import datetime
-from functools import cached_property
-from typing import Any, Self
+import asyncio
+import gzip
+import json
+from collections.abc import AsyncIterator, Callable, Iterator, Set
+from contextlib import contextmanager, suppress
+from datetime import UTC, datetime, timedelta
+from functools import cached_property, partial
+from pathlib import Path
+from typing import Any, Self, TextIO
 
 import cattrs
 import cattrs.preconf.json
 
 from .. import ctx
+from .._logging import logger
+from .._utils.aio import cancel_tasks
 from .._utils.attrs import fauxfrozen
+from .._utils.compression import zstd
 from .._utils.iteration import bucketise
 from .._utils.text import normalise_names
+from ..resolvers import Resolver
 from ..wow_installations import Flavour
 
 CATALOGUE_VERSION = 8
 
+# Matches the lifetime of the catalogue on the client.
+_MAX_CHECKPOINT_AGE = timedelta(hours=4)
+
 
 _catalogue_converter = cattrs.Converter(
     unstruct_collection_overrides={
@@ -27,6 +39,10 @@ cattrs.preconf.json.configure_converter(_catalogue_converter)
 _normalise_name = normalise_names('')
 
 
+def make_trigrams(value: str) -> set[str]:
+    return {value[i : i + 3] for i in range(len(value) - 2)}
+
+
 @fauxfrozen(kw_only=True)
 class AddonKey:
     source: str
@@ -47,24 +63,150 @@ class CatalogueEntry(AddonKey):
     derived_download_score: float
 
 
-async def collate(start_date: datetime | None) -> dict[str, Any]:
-    return _catalogue_converter.unstructure(
-        {
-            'version': CATALOGUE_VERSION,
-            'entries': [
+def _read_checkpoint_header(checkpoint: TextIO) -> str | None:
+    "Read the checkpoint header, returning ``None`` if it is missing or out of date."
+    header = checkpoint.readline()
+    try:
+        created_at = datetime.fromisoformat(json.loads(header)['created_at'])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+    if datetime.now(UTC) - created_at > _MAX_CHECKPOINT_AGE:
+        return None
+
+    return header
+
+
+async def _checkpoint_source(resolver: Resolver, checkpoint_dir: Path) -> Path:
+    source = resolver.metadata.id
+
+    checkpoint_path = checkpoint_dir / f'{source}.jsonl'
+    with suppress(FileNotFoundError), checkpoint_path.open(encoding='utf-8') as checkpoint:
+        if _read_checkpoint_header(checkpoint):
+            logger.info(f'Resuming from {source} checkpoint')
+            return checkpoint_path
+
+    # Entries collected before an interruption are carried over and the source
+    # is crawled anew, skipping entries which were already collected.
+    # The trailing line is dropped if it was not written out in full.
+    partial_checkpoint_path = checkpoint_path.with_suffix('.jsonl.partial')
+    header = None
+    entry_lines = list[str]()
+    with (
+        suppress(FileNotFoundError),
+        partial_checkpoint_path.open(encoding='utf-8') as partial_checkpoint,
+    ):
+        header = _read_checkpoint_header(partial_checkpoint)
+        if header:
+            entry_lines = [i for i in partial_checkpoint if i.endswith('\n')]
+            logger.info(f'Resuming {source} catalogue after {len(entry_lines)} entries')
+
+    if not header:
+        header = json.dumps({'created_at': datetime.now(UTC).isoformat()}) + '\n'
+
+    seen_ids = {json.loads(i)['id'] for i in entry_lines}
+
+    with partial_checkpoint_path.open('w', encoding='utf-8') as partial_checkpoint:
+        partial_checkpoint.write(header)
+        partial_checkpoint.writelines(entry_lines)
+
+        async for entry in resolver.catalogue():
+            if entry['id'] in seen_ids:
+                continue
+
+            seen_ids.add(entry['id'])
+            unstructured_entry = _catalogue_converter.unstructure(
                 {
-                    'source': r.metadata.id,
+                    'source': source,
                     'slug': '',
                     'folders': [],
                     'same_as': [],
                 }
-                | e
-                for r in ctx.config.resolvers().values()
-                async for e in r.catalogue()
-                if not start_date or e['last_updated'] >= start_date
-            ],
-        }
-    )
+                | entry
+            )
+            partial_checkpoint.write(json.dumps(unstructured_entry) + '\n')
+
+    partial_checkpoint_path.replace(checkpoint_path)
+    logger.info(f'Collated {source} catalogue')
+    return checkpoint_path
+
+
+async def collate(
+    start_date: datetime | None, checkpoint_dir: Path
+) -> AsyncIterator[dict[str, Any]]:
+    # Sources are crawled concurrently and their entries are checkpointed to disk
+    # as they are crawled so that an interrupted run will pick up where it left off.
+    # Checkpoints are discarded once they are older than ``_MAX_CHECKPOINT_AGE``.
+    # Entries are streamed from the checkpoints in resolver order.
+    checkpoint_tasks = [
+        asyncio.create_task(_checkpoint_source(r, checkpoint_dir))
+        for r in ctx.config.resolvers().values()
+    ]
+    try:
+        for checkpoint_task in checkpoint_tasks:
+            with (await checkpoint_task).open(encoding='utf-8') as checkpoint:
+                checkpoint.readline()  # Header
+
+                for line in checkpoint:
+                    entry = json.loads(line)
+                    if (
+                        not start_date
+                        or datetime.fromisoformat(entry['last_updated']) >= start_date
+                    ):
+                        yield entry
+    finally:
+        await cancel_tasks(checkpoint_tasks)
+
+
+@contextmanager
+def open_catalogue_writer(
+    path: Path, *, indent: int | None = None
+) -> Iterator[Callable[[dict[str, Any]], None]]:
+    "Incrementally write a catalogue, one unstructured entry at a time."
+    if indent is None:
+        entry_prefix = ''
+        head = f'{{"version":{CATALOGUE_VERSION},"entries":['
+        tail = ']}'
+        empty_tail = tail
+        dumps = partial(json.dumps, separators=(',', ':'))
+    else:
+        # Matches the output of ``json.dumps(catalogue, indent=indent)``.
+        entry_prefix = '\n' + ' ' * indent * 2
+        head = f'{{\n{" " * indent}"version": {CATALOGUE_VERSION},\n{" " * indent}"entries": ['
+        tail = f'\n{" " * indent}]\n}}'
+        empty_tail = ']\n}'
+        dumps = partial(json.dumps, indent=indent)
+
+    partial_path = path.with_name(f'{path.name}.partial')
+    match path.suffix:
+        case '.gz':
+            open_ = partial(gzip.open, mode='wt')
+        case '.zst':
+            if zstd is None:
+                raise ValueError('zstd is not available')
+            open_ = partial(zstd.open, mode='wt')
+        case _:
+            open_ = partial(open, mode='w')
+
+    with open_(partial_path, encoding='utf-8') as file:
+        file.write(head)
+
+        entry_count = 0
+
+        def write_entry(entry: dict[str, Any]):
+            nonlocal entry_count
+
+            if entry_count:
+                file.write(',')
+            file.write(entry_prefix)
+            file.write(dumps(entry).replace('\n', entry_prefix))
+            entry_count += 1
+
+        yield write_entry
+
+        file.write(tail if entry_count else empty_tail)
+
+    partial_path.replace(path)
 
 
 @fauxfrozen(kw_only=True)
@@ -114,3 +256,37 @@ class ComputedCatalogue:
     @cached_property
     def keyed_entries(self) -> dict[tuple[str, str], CatalogueEntry]:
         return {(e.source, e.id): e for e in self.entries}
+
+    @cached_property
+    def entries_by_normalised_name(self) -> dict[str, list[CatalogueEntry]]:
+        return bucketise(self.entries, key=lambda e: e.normalised_name)
+
+    @cached_property
+    def normalised_names(self) -> list[str]:
+        "Unique normalised names in catalogue order."
+        return list(self.entries_by_normalised_name)
+
+    @cached_property
+    def normalised_name_trigrams(self) -> dict[str, list[int]]:
+        "Inverted index of trigrams to ``normalised_names`` indices."
+        trigrams = dict[str, list[int]]()
+        for index, name in enumerate(self.normalised_names):
+            for trigram in make_trigrams(name):
+                trigrams.setdefault(trigram, []).append(index)
+
+        return trigrams
+
+    @cached_property
+    def folder_names_by_flavour(self) -> dict[Flavour, dict[str, list[tuple[int, int]]]]:
+        "Per-flavour inverted index of folder names to ``entries`` and ``folders`` indices."
+        folder_names_by_flavour = {f: dict[str, list[tuple[int, int]]]() for f in Flavour}
+        for entry_index, entry in enumerate(self.entries):
+            for folders_index, folders in enumerate(entry.folders):
+                for flavour in entry.game_flavours:
+                    folder_names = folder_names_by_flavour[flavour]
+                    for folder_name in folders:
+                        folder_names.setdefault(folder_name, []).append(
+                            (entry_index, folders_index)
+                        )
+
+        return folder_names_by_flavour
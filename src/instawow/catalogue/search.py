@@ -1,20 +1,211 @@
 from __future__ import annotations
 
-from collections.abc import Callable, Iterator, Set
+import weakref
+from collections import Counter, OrderedDict
+from collections.abc import Callable, Hashable, Iterator, Sequence, Set
 from datetime import datetime
+from functools import cached_property
+from itertools import chain
+from pathlib import Path
 from typing import Literal
 
 from .. import ctx
+from .._logging import logger
+from .._utils.aio import run_in_thread
 from .._utils.iteration import bucketise
 from .._utils.text import normalise_names
 from . import synchronise as synchronise_catalogue
-from .cataloguer import CatalogueEntry
+from .cataloguer import CatalogueEntry, ComputedCatalogue, make_trigrams
 
 _normalise_search_terms = normalise_names('')
 
+# Queries with fewer trigrams than this are matched against the entire catalogue.
+_MIN_SHORTLIST_TRIGRAMS = 2
 
-async def search(
-    search_terms: str,
+_RELEVANCE_WEIGHT = 0.5
+_DOWNLOAD_WEIGHT = 1 - _RELEVANCE_WEIGHT
+
+# Full-text matches are retrieved in bulk before they are filtered and re-ranked.
+_FULL_TEXT_CANDIDATE_LIMIT = 500
+
+_UPDATE_FTS_INDEX_LOCK = '_UPDATE_FTS_INDEX_'
+
+
+def _shortlist_names(
+    catalogue: ComputedCatalogue, search_terms: str, max_names: int | None = None
+) -> list[str] | None:
+    "Select names which share a proportion of their trigrams with the search terms."
+    trigrams = make_trigrams(search_terms)
+    if len(trigrams) < _MIN_SHORTLIST_TRIGRAMS:
+        return None
+
+    trigram_index = catalogue.normalised_name_trigrams
+    overlap = Counter(chain.from_iterable(trigram_index.get(t, ()) for t in trigrams))
+    min_overlap = max(1, len(trigrams) // 4)
+
+    overlap_counts = overlap.items() if max_names is None else overlap.most_common(max_names)
+
+    normalised_names = catalogue.normalised_names
+    return [normalised_names[i] for i in sorted(i for i, c in overlap_counts if c >= min_overlap)]
+
+
+def _get_name(entry: CatalogueEntry):
+    return entry.normalised_name
+
+
+class _SearchCorpus:
+    "Filtered catalogue entries bucketed by normalised name."
+
+    def __init__(self, entries_by_name: dict[str, list[CatalogueEntry]]) -> None:
+        self.entries_by_name = entries_by_name
+        self.names = list(entries_by_name)
+        self.name_indices = {n: i for i, n in enumerate(self.names)}
+
+    @cached_property
+    def keyed_entries(self) -> dict[tuple[str, str], CatalogueEntry]:
+        return {(e.source, e.id): e for i in self.entries_by_name.values() for e in i}
+
+    def rank(
+        self,
+        search_terms: str,
+        shortlisted_names: Sequence[str] | None,
+        *,
+        limit: int,
+        threshold: int,
+    ) -> list[CatalogueEntry]:
+        "Rank the best fuzzy matches by a blend of their fuzzy score and download score."
+        import rapidfuzz
+
+        if shortlisted_names is None:
+            choices = self.names
+        else:
+            name_indices = self.name_indices
+            choices = [
+                self.names[i]
+                for i in sorted(name_indices[n] for n in shortlisted_names if n in name_indices)
+            ]
+
+        # Only the top ``limit * 2`` names by fuzzy score are blended with their
+        # download score so that popular but weak matches don't crowd out strong ones.
+        try:
+            import numpy as np
+        except ModuleNotFoundError:
+            matches = rapidfuzz.process.extract(
+                search_terms,
+                choices,
+                scorer=rapidfuzz.fuzz.WRatio,
+                limit=limit * 2,
+                score_cutoff=threshold,
+            )
+            fuzzy_scores = {n: s for n, s, _ in matches}
+        else:
+            scores = rapidfuzz.process.cdist(
+                [search_terms],
+                choices,
+                scorer=rapidfuzz.fuzz.WRatio,
+                score_cutoff=threshold,
+                dtype=np.float64,
+            )[0]
+            matched = np.flatnonzero(scores >= threshold) if threshold else np.arange(len(scores))
+            top = matched[np.argsort(-scores[matched], kind='stable')[: limit * 2]]
+            fuzzy_scores = {choices[i]: s for i, s in zip(top.tolist(), scores[top].tolist())}
+
+        weighted_entries = sorted(
+            (
+                (-(s / 100 * _RELEVANCE_WEIGHT + e.derived_download_score * _DOWNLOAD_WEIGHT), e)
+                for n, s in fuzzy_scores.items()
+                for e in self.entries_by_name[n]
+            ),
+            key=lambda v: v[0],
+        )
+        return [e for _, e in weighted_entries[:limit]]
+
+    def rank_full_text(
+        self, matches: Sequence[tuple[tuple[str, str], float]], *, limit: int
+    ) -> list[CatalogueEntry]:
+        "Rank full-text matches by a blend of their BM25 score and download score."
+        keyed_entries = self.keyed_entries
+        matched_entries = [(keyed_entries[k], s) for k, s in matches if k in keyed_entries]
+        if not matched_entries:
+            return []
+
+        best_score = max(s for _, s in matched_entries) or 1
+        weighted_entries = sorted(
+            (
+                (
+                    -(
+                        s / best_score * _RELEVANCE_WEIGHT
+                        + e.derived_download_score * _DOWNLOAD_WEIGHT
+                    ),
+                    e,
+                )
+                for e, s in matched_entries
+            ),
+            key=lambda v: v[0],
+        )
+        return [e for _, e in weighted_entries[:limit]]
+
+
+class _FullTextIndexTracker:
+    "Keep track of the catalogue the full-text index was last updated from."
+
+    def __init__(self) -> None:
+        self._catalogue_ref: weakref.ref[ComputedCatalogue] | None = None
+        self._index_path: Path | None = None
+
+    async def update(self, catalogue: ComputedCatalogue, index_path: Path) -> None:
+        from ._fts_index import update_index
+
+        async with ctx.sync.locks()[_UPDATE_FTS_INDEX_LOCK]:
+            if (
+                self._catalogue_ref is not None
+                and self._catalogue_ref() is catalogue
+                and self._index_path == index_path
+            ):
+                return
+
+            await run_in_thread(update_index)(index_path, catalogue)
+            self._catalogue_ref = weakref.ref(catalogue)
+            self._index_path = index_path
+
+
+_fts_index_tracker = _FullTextIndexTracker()
+
+
+class _SearchCorpusCache:
+    "LRU cache of search corpora for the most recently searched catalogue."
+
+    def __init__(self, maxsize: int) -> None:
+        self._maxsize = maxsize
+        self._catalogue_ref: weakref.ref[ComputedCatalogue] | None = None
+        self._corpora = OrderedDict[Hashable, _SearchCorpus]()
+
+    def get(
+        self,
+        catalogue: ComputedCatalogue,
+        key: Hashable,
+        make_corpus: Callable[[], _SearchCorpus],
+    ) -> _SearchCorpus:
+        if self._catalogue_ref is None or self._catalogue_ref() is not catalogue:
+            self._catalogue_ref = weakref.ref(catalogue)
+            self._corpora.clear()
+
+        corpus = self._corpora.get(key)
+        if corpus is None:
+            corpus = self._corpora[key] = make_corpus()
+            if len(self._corpora) > self._maxsize:
+                self._corpora.popitem(last=False)
+        else:
+            self._corpora.move_to_end(key)
+
+        return corpus
+
+
+_search_corpora = _SearchCorpusCache(maxsize=8)
+
+
+async def search_many(
+    queries: Sequence[str],
     *,
     limit: int,
     sources: Set[str] = frozenset(),
@@ -23,18 +214,17 @@ async def search(
     filter_installed: Literal[
         'ident', 'include_only', 'exclude', 'exclude_from_all_sources'
     ] = 'ident',
-) -> list[CatalogueEntry]:
-    "Search the catalogue for packages by name."
-    import rapidfuzz
+    full_text: bool = False,
+    quick: bool = False,
+) -> list[list[CatalogueEntry]]:
+    """Search the catalogue for several packages by name in one go.
 
+    With ``quick``, only the ``limit * 2`` names which share the most trigrams
+    with the search terms are scored.
+    """
     resolvers = ctx.config.resolvers()
     catalogue = await synchronise_catalogue()
 
-    ew = 0.5
-    dw = 1 - ew
-
-    threshold = 0 if search_terms == '*' else 70
-
     if sources:
         unknown_sources = sources - resolvers.keys()
         if unknown_sources:
@@ -52,8 +242,12 @@ async def search(
         ):
             return cursor.execute('SELECT source, id FROM pkg').fetchall()
 
+    flavour = ctx.config.config().product['flavour']
+    installed_pkg_keys = (
+        None if filter_installed == 'ident' else frozenset(get_installed_pkg_keys())
+    )
+
     def make_filter_fns() -> Iterator[Callable[[CatalogueEntry], bool]]:
-        flavour = ctx.config.config().product['flavour']
         yield lambda e: flavour in e.game_flavours
 
         if sources:
@@ -63,10 +257,13 @@ async def search(
             start_date_ = start_date
             yield lambda e: e.last_updated >= start_date_
 
-        if filter_installed in {'exclude', 'exclude_from_all_sources'}:
-            installed_pkg_keys = set(get_installed_pkg_keys())
+        if installed_pkg_keys is not None and filter_installed in {
+            'exclude',
+            'exclude_from_all_sources',
+        }:
+            excluded_pkg_keys = set(installed_pkg_keys)
             if filter_installed == 'exclude_from_all_sources':
-                installed_pkg_keys |= {
+                excluded_pkg_keys |= {
                     (s.source, s.id)
                     for k in installed_pkg_keys
                     for e in (catalogue.keyed_entries.get(k),)
@@ -74,38 +271,95 @@ async def search(
                     for s in e.same_as
                 }
 
-            yield lambda e: (e.source, e.id) not in installed_pkg_keys
+            yield lambda e: (e.source, e.id) not in excluded_pkg_keys
 
-    filter_fns = list(make_filter_fns())
+    def make_corpus():
+        filter_fns = list(make_filter_fns())
 
-    entries = catalogue.entries
+        entries = catalogue.entries
 
-    if prefer_source:
-        entries = (e for e in entries if not any(s.source == prefer_source for s in e.same_as))
+        if prefer_source:
+            entries = (e for e in entries if not any(s.source == prefer_source for s in e.same_as))
 
-    if filter_installed == 'include_only':
-        installed_pkg_keys = get_installed_pkg_keys()
-        entries = (e for k in installed_pkg_keys for e in (catalogue.keyed_entries.get(k),) if e)
+        if installed_pkg_keys is not None and filter_installed == 'include_only':
+            entries = (
+                e
+                for k in sorted(installed_pkg_keys)
+                for e in (catalogue.keyed_entries.get(k),)
+                if e
+            )
 
-    s = _normalise_search_terms(search_terms)
+        return _SearchCorpus(
+            bucketise((e for e in entries if all(f(e) for f in filter_fns)), key=_get_name)
+        )
 
-    tokens_to_entries = bucketise(
-        ((e.normalised_name, e) for e in entries if all(f(e) for f in filter_fns)),
-        key=lambda v: v[0],
-    )
-    matches = rapidfuzz.process.extract(
-        s,
-        list(tokens_to_entries),
-        scorer=rapidfuzz.fuzz.WRatio,
-        limit=limit * 2,
-        score_cutoff=threshold,
-    )
-    weighted_entries = sorted(
+    corpus = _search_corpora.get(
+        catalogue,
         (
-            (-((s / 100) * ew + e.derived_download_score * dw), e)
-            for m, s, _ in matches
-            for _, e in tokens_to_entries[m]
+            flavour,
+            frozenset(sources),
+            prefer_source,
+            start_date,
+            filter_installed,
+            installed_pkg_keys,
         ),
-        key=lambda v: v[0],
+        make_corpus,
+    )
+
+    def search_one(search_terms: str):
+        if search_terms == '*':
+            return corpus.rank('', None, limit=limit, threshold=0)
+
+        s = _normalise_search_terms(search_terms)
+        shortlisted_names = _shortlist_names(catalogue, s, limit * 2 if quick else None)
+        return corpus.rank(s, shortlisted_names, limit=limit, threshold=70)
+
+    if full_text:
+        from ._fts_index import FTS_INDEX_NAME, is_fts5_available, query_index
+
+        if is_fts5_available():
+            index_path = ctx.config.config().global_config.dirs.cache / FTS_INDEX_NAME
+            await _fts_index_tracker.update(catalogue, index_path)
+
+            @run_in_thread
+            def query_many():
+                return [
+                    None if q == '*' else query_index(index_path, q, _FULL_TEXT_CANDIDATE_LIMIT)
+                    for q in queries
+                ]
+
+            return [
+                search_one(q) if m is None else corpus.rank_full_text(m, limit=limit)
+                for q, m in zip(queries, await query_many())
+            ]
+
+        logger.warning('SQLite was built without FTS5; falling back to fuzzy search')
+
+    return [search_one(q) for q in queries]
+
+
+async def search(
+    search_terms: str,
+    *,
+    limit: int,
+    sources: Set[str] = frozenset(),
+    prefer_source: str | None = None,
+    start_date: datetime | None = None,
+    filter_installed: Literal[
+        'ident', 'include_only', 'exclude', 'exclude_from_all_sources'
+    ] = 'ident',
+    full_text: bool = False,
+    quick: bool = False,
+) -> list[CatalogueEntry]:
+    "Search the catalogue for packages by name."
+    (entries,) = await search_many(
+        [search_terms],
+        limit=limit,
+        sources=sources,
+        prefer_source=prefer_source,
+        start_date=start_date,
+        filter_installed=filter_installed,
+        full_text=full_text,
+        quick=quick,
     )
-    return [e for _, e in weighted_entries[:limit]]
+    return entries
@@ -4,9 +4,9 @@ import contextvars
 import datetime as dt
 import enum
 import textwrap
-from collections.abc import Awaitable, Collection, Mapping, Sequence
+from collections.abc import Awaitable, Collection, Mapping, Sequence, Set
 from functools import partial, reduce
-from itertools import chain, count, repeat
+from itertools import chain, count, islice, repeat
 from typing import Any, overload
 
 import click
@@ -75,8 +75,11 @@ def run_with_progress[T](awaitable: Awaitable[T], **params: Any) -> T:
     if params['no_cache']:
         make_init_web_client = partial(make_init_web_client, None)
     else:
+        global_config = ctx.config.config().global_config
         make_init_web_client = partial(
-            make_init_web_client, ctx.config.config().global_config.dirs.cache
+            make_init_web_client,
+            global_config.dirs.cache,
+            max_cache_size=global_config.http_cache_max_size_mib * 2**20,
         )
 
     if suppress_progress:
@@ -444,21 +447,42 @@ def rollback(addon: definitions.Defn, undo: bool):
 @click.option(
     '--list-unreconciled', is_flag=True, default=False, help='List unreconciled add-ons and exit.'
 )
-def reconcile(auto: bool, list_unreconciled: bool):
+@click.option(
+    '--include-skipped',
+    is_flag=True,
+    default=False,
+    help='Revisit unchanged add-ons which were skipped or went unmatched on a previous run.',
+)
+def reconcile(auto: bool, list_unreconciled: bool, include_skipped: bool):
     "Reconcile pre-installed add-ons."
 
     from .._utils.iteration import all_eq, uniq
     from .._utils.text import tabulate
-    from ..matchers import DEFAULT_MATCHERS, AddonFolder, get_unreconciled_folders
+    from ..matchers import (
+        DEFAULT_MATCHERS,
+        AddonFolder,
+        Matcher,
+        get_unreconciled_folders,
+        match_all,
+        record_reconcile_outcomes,
+    )
     from ..resolvers import PkgCandidate
     from .prompts import Choice, confirm, select_one
 
-    leftovers = get_unreconciled_folders()
+    exclude_settled = not (list_unreconciled or include_skipped)
+
+    leftovers = get_unreconciled_folders(exclude_settled=exclude_settled)
     if list_unreconciled and leftovers:
         click.echo(tabulate([('unreconciled',), *((f.name,) for f in sorted(leftovers))]))
         return
     elif not leftovers:
-        click.echo('No add-ons left to reconcile.')
+        if exclude_settled and get_unreconciled_folders():
+            click.echo(
+                'No new or changed add-ons to reconcile.'
+                '  Pass `--include-skipped` to revisit add-ons which were previously skipped.'
+            )
+        else:
+            click.echo('No add-ons left to reconcile.')
         return
 
     if not auto:
@@ -471,8 +495,9 @@ def reconcile(auto: bool, list_unreconciled: bool):
                 Versions that differ from the installed version or differ between
                 choices are highlighted in purple.
 
-                instawow will perform three passes in decreasing order of accuracy,
-                looking to match source IDs and add-on names in TOC files, and folders.
+                instawow will look for matches by fingerprint, by source IDs
+                and add-on names in TOC files, and by folder name.  Matches are
+                presented in decreasing order of accuracy.
 
                 Selected add-ons will be reinstalled.
 
@@ -529,8 +554,25 @@ def reconcile(auto: bool, list_unreconciled: bool):
     def gather_selections(
         groups: Collection[tuple[Sequence[AddonFolder], Sequence[definitions.Defn]]],
         pkg_candidates: Mapping[definitions.Defn, PkgCandidate],
+        unresolved_defns: Set[definitions.Defn],
     ):
         for addon_folder, defns in groups:
+            group_key = (frozenset(addon_folder), tuple(defns))
+            if group_key in seen_groups:
+                continue
+
+            # Folders claimed by a more accurate match are not offered again.
+            # The rest are matched anew without them.
+            if claimed_folders.intersection(addon_folder):
+                deferred_folders.update(addon_folder)
+                deferred_groups.add(group_key)
+                continue
+
+            seen_groups.add(group_key)
+
+            if unresolved_defns.intersection(defns):
+                unresolved_folders.update(addon_folder)
+
             shortlist = {
                 definitions.Defn(o.source, p['slug'], p['id']): p
                 for o in defns
@@ -538,26 +580,76 @@ def reconcile(auto: bool, list_unreconciled: bool):
                 if p
             }
             if shortlist:
+                offered_folders.update(addon_folder)
+                deferred_folders.difference_update(addon_folder)
                 selection = select_pkg(addon_folder, shortlist)
-                yield selection
-            else:
-                yield None
+                if selection:
+                    claimed_folders.update(addon_folder)
+                    yield selection
+
+    async def match_and_resolve(
+        leftovers: frozenset[AddonFolder], matchers: Mapping[str, Matcher]
+    ):
+        defn_groups_by_matcher = await match_all(leftovers, matchers)
+        resolve_results = await pkg_management.resolve(
+            uniq(d for g in defn_groups_by_matcher.values() for _, b in g for d in b)
+        )
+        return defn_groups_by_matcher, resolve_results
 
-    for matcher_fn in DEFAULT_MATCHERS.values():
-        defn_groups = run_with_progress(matcher_fn(leftovers))
-        resolve_results = run_with_progress(
-            pkg_management.resolve(uniq(d for _, b in defn_groups for d in b))
+    claimed_folders = set[AddonFolder]()
+    deferred_folders = set[AddonFolder]()
+    offered_folders = set[AddonFolder]()
+    unresolved_folders = set[AddonFolder]()
+    seen_groups = set[tuple[frozenset[AddonFolder], tuple[definitions.Defn, ...]]]()
+    deferred_groups = set[tuple[frozenset[AddonFolder], tuple[definitions.Defn, ...]]]()
+
+    selections = list[definitions.Defn]()
+    matchers = DEFAULT_MATCHERS
+
+    while matchers:
+        defn_groups_by_matcher, resolve_results = run_with_progress(
+            match_and_resolve(frozenset(leftovers - claimed_folders), matchers)
         )
-        pkg_candidates, _ = pkg_management.split_results(resolve_results.items())
+        pkg_candidates, resolve_errors = pkg_management.split_results(resolve_results.items())
+        unresolved_defns = {
+            d for d, e in resolve_errors.items() if isinstance(e, _results.InternalError)
+        }
 
-        selections = [s for s in gather_selections(defn_groups, pkg_candidates) if s]
-        if selections and confirm_install():
-            results = run_with_progress(pkg_management.install(selections, replace_folders=True))
-            report_results(results.items())
+        # Matchers from the first to pass over a group on are re-run
+        # on the folders which have yet to be claimed.
+        rematch_from = None
+        for index, groups in enumerate(defn_groups_by_matcher.values()):
+            deferred_groups.clear()
+            selections.extend(gather_selections(groups, pkg_candidates, unresolved_defns))
+            if rematch_from is None and deferred_groups:
+                rematch_from = index
+
+        matchers = (
+            {} if rematch_from is None else dict(islice(matchers.items(), rematch_from, None))
+        )
 
-        leftovers = get_unreconciled_folders()
-        if not leftovers:
-            break
+    selections = uniq(selections)
+    if selections and confirm_install():
+        results = run_with_progress(pkg_management.install(selections, replace_folders=True))
+        report_results(results.items())
+    else:
+        claimed_folders.clear()
+
+    leftovers = get_unreconciled_folders(exclude_settled=exclude_settled)
+
+    # Folders whose matches were passed over in favour of another match
+    # or which failed to install are left for the next run to revisit,
+    # as are folders which were not offered because their matches
+    # could not be resolved.
+    record_reconcile_outcomes(
+        {
+            f: 'skipped' if f in offered_folders else 'unmatched'
+            for f in leftovers
+            if f not in deferred_folders
+            and f not in claimed_folders
+            and (f in offered_folders or f not in unresolved_folders)
+        }
+    )
 
     if leftovers:
         click.echo()
@@ -682,6 +774,12 @@ def rereconcile(addons: Sequence[definitions.Defn]):
     default=False,
     help='Do not exclude installed add-ons from search results.',
 )
+@click.option(
+    '--full-text',
+    is_flag=True,
+    default=False,
+    help='Match search terms against add-on names, slugs and folders using a full-text index.',
+)
 def search(
     search_terms: str,
     limit: int,
@@ -689,6 +787,7 @@ def search(
     prefer_source: str | None,
     start_date: dt.datetime | None,
     no_exclude_installed: bool,
+    full_text: bool,
 ):
     "Search for add-ons to install."
 
@@ -703,6 +802,7 @@ def search(
             prefer_source=prefer_source,
             start_date=start_date,
             filter_installed='ident' if no_exclude_installed else 'exclude_from_all_sources',
+            full_text=full_text,
         )
     )
     if catalogue_entries:
@@ -991,6 +1091,74 @@ def cache_clear():
     shutil.rmtree(ctx.config.config().global_config.dirs.cache)
 
 
+@_cache_group.command('prune')
+@click.option(
+    '--unused-for',
+    type=click.IntRange(min=0),
+    metavar='DAYS',
+    help='Remove responses which have not been used in this many days.',
+)
+@click.option(
+    '--max-size',
+    type=click.IntRange(min=0),
+    metavar='MIB',
+    help='Remove least recently used responses in excess of this size.  '
+    'Defaults to `global_config.http_cache_max_size_mib`.',
+)
+@click.option(
+    '--host',
+    'hosts',
+    multiple=True,
+    help='Remove responses from this host.  Can be repeated.',
+)
+def cache_prune(unused_for: int | None, max_size: int | None, hosts: Sequence[str]):
+    "Prune the HTTP cache."
+
+    from ..http._cache import open_cache_store
+
+    global_config = ctx.config.config().global_config
+
+    with open_cache_store(global_config.dirs.cache) as store:
+        entries, size = store.prune(
+            unused_for=None if unused_for is None else unused_for * 60 * 60 * 24,
+            max_size=(global_config.http_cache_max_size_mib if max_size is None else max_size)
+            * 2**20,
+            hosts=hosts,
+        )
+
+    click.echo(f'Removed {entries} cache entries ({size / 2**20:.1f} MiB).')
+
+
+@_cache_group.command('stats')
+def cache_stats():
+    "Show HTTP cache usage and hit rates by host."
+
+    from .._utils.text import tabulate
+    from ..http._cache import open_cache_store
+
+    with open_cache_store(ctx.config.config().global_config.dirs.cache) as store:
+        host_stats = store.get_host_stats()
+
+    click.echo(
+        tabulate(
+            [
+                ('host', 'entries', 'size', 'hits', 'misses', 'hit rate'),
+                *(
+                    (
+                        s.host or '-',
+                        s.entries,
+                        f'{s.size / 2**20:.1f} MiB',
+                        s.hits,
+                        s.misses,
+                        f'{s.hits / (s.hits + s.misses):.0%}' if s.hits + s.misses else '-',
+                    )
+                    for s in host_stats
+                ),
+            ]
+        )
+    )
+
+
 @_register_plugin_commands
 @cli.group('plugins')
 def _plugin_group():  # pyright: ignore[reportUnusedFunction]
@@ -1006,6 +1174,7 @@ class _EditableConfigOptions(enum.StrEnum):
     AddonDir = 'addon_dir'
     FlavourOverride = 'flavour_override'
     AutoUpdateCheck = 'global_config.auto_update_check'
+    StreamExtraction = 'global_config.stream_extraction'
     GithubAccessToken = 'global_config.access_tokens.github'
     CfcoreAccessToken = 'global_config.access_tokens.cfcore'
     WagoAddonsAccessToken = 'global_config.access_tokens.wago_addons'
@@ -1027,6 +1196,7 @@ class _EditableConfigOptions(enum.StrEnum):
         EnumValueChoiceParam(_EditableConfigOptions),
         value_types={
             _EditableConfigOptions.AutoUpdateCheck: bool,
+            _EditableConfigOptions.StreamExtraction: bool,
         },
     ),
 )
@@ -1141,6 +1311,11 @@ def configure_profile(editable_config_values: Mapping[_EditableConfigOptions, An
                 'Periodically check for instawow updates?'
             ).prompt()
 
+        if _EditableConfigOptions.StreamExtraction in interactive_editable_config_keys:
+            editable_config_values[_EditableConfigOptions.StreamExtraction] = confirm(
+                'Extract add-ons while they are downloading?'
+            ).prompt()
+
         if _EditableConfigOptions.GithubAccessToken in interactive_editable_config_keys:
             click.echo(
                 textwrap.fill(
@@ -1268,29 +1443,57 @@ def debug():
     help='Omit results before this date.',
     metavar='YYYY-MM-DD',
 )
-def generate_catalogue(start_date: dt.datetime | None):
+@click.option(
+    '--compress',
+    'compressions',
+    multiple=True,
+    type=click.Choice(['gzip', 'zstd']),
+    help='Also write a compressed copy of the compact catalogue.  Repeatable.',
+)
+def generate_catalogue(start_date: dt.datetime | None, compressions: Sequence[str]):
     "Generate the master catalogue."
 
-    import json
+    import shutil
+    from contextlib import ExitStack
     from pathlib import Path
     from types import SimpleNamespace
 
-    from ..catalogue.cataloguer import collate
+    from ..catalogue.cataloguer import CATALOGUE_VERSION, collate, open_catalogue_writer
 
     @ctx.config.config.set  # pyright: ignore[reportArgumentType]
     def _():
         return SimpleNamespace(global_config=_config.GlobalConfig.from_values(env=True))
 
-    catalogue_dict = run_with_progress(collate(start_date), verbosity=1)
-    catalogue_path = Path(f'base-catalogue-v{catalogue_dict["version"]}.json').resolve()
-    catalogue_path.write_text(
-        json.dumps(catalogue_dict, indent=2),
-        encoding='utf-8',
-    )
-    catalogue_path.with_suffix(f'.compact{catalogue_path.suffix}').write_text(
-        json.dumps(catalogue_dict, separators=(',', ':')),
-        encoding='utf-8',
-    )
+    catalogue_path = Path(f'base-catalogue-v{CATALOGUE_VERSION}.json').resolve()
+    compact_catalogue_path = catalogue_path.with_suffix(f'.compact{catalogue_path.suffix}')
+    checkpoint_dir = catalogue_path.with_suffix('.checkpoint')
+
+    compression_suffixes = {'gzip': '.gz', 'zstd': '.zst'}
+
+    async def write_catalogue():
+        with ExitStack() as exit_stack:
+            writers = [
+                exit_stack.enter_context(open_catalogue_writer(catalogue_path, indent=2)),
+                exit_stack.enter_context(open_catalogue_writer(compact_catalogue_path)),
+                *(
+                    exit_stack.enter_context(
+                        open_catalogue_writer(
+                            compact_catalogue_path.with_name(
+                                compact_catalogue_path.name + compression_suffixes[c]
+                            )
+                        )
+                    )
+                    for c in compressions
+                ),
+            ]
+            async for entry in collate(start_date, checkpoint_dir):
+                for write_entry in writers:
+                    write_entry(entry)
+
+    checkpoint_dir.mkdir(exist_ok=True)
+    run_with_progress(write_catalogue(), verbosity=1)
+
+    shutil.rmtree(checkpoint_dir)
 
 
 main = partial(contextvars.copy_context().run, cli)
@@ -96,6 +96,12 @@ class GlobalConfig:
     auto_update_check: bool = field(
         default=True, metadata=FieldMetadata(env_prefix=NAME, store=True)
     )
+    stream_extraction: bool = field(
+        default=False, metadata=FieldMetadata(env_prefix=NAME, store=True)
+    )
+    http_cache_max_size_mib: int = field(
+        default=1024, metadata=FieldMetadata(env_prefix=NAME, store=True)
+    )
     access_tokens: _AccessTokens = field(
         default=_AccessTokens(), metadata=FieldMetadata(env_prefix=NAME, store='independently')
     )
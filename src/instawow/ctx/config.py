@@ -68,13 +68,24 @@ class _Resolvers(dict[str, '_resolvers.Resolver']):
 
 
 class _ResolverPkgDownloaders(
-    dict[str, Callable[[definitions.Defn, str], Awaitable[AnyResult[Path]]]]
+    dict[
+        str,
+        Callable[[definitions.Defn, str, Mapping[str, str]], Awaitable[AnyResult[Path]]],
+    ]
 ):
     def __init__(self, resolvers: _Resolvers) -> None:
         self.__resolvers = resolvers
 
     def __missing__(self, key: str):
-        downloader = self[key] = resultify(self.__resolvers[key].download_pkg_archive)
+        download_pkg_archive = self.__resolvers[key].download_pkg_archive
+
+        async def download(defn: definitions.Defn, url: str, hashes: Mapping[str, str]):
+            # Resolvers which predate hashes do not accept them.
+            if hashes:
+                return await download_pkg_archive(defn, url, hashes=hashes)
+            return await download_pkg_archive(defn, url)
+
+        downloader = self[key] = resultify(download)
         return downloader
 
 
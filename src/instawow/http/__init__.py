@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import asyncio
 import os
+import pickle
 import ssl
-from collections.abc import AsyncGenerator
+import warnings
+from collections.abc import AsyncGenerator, Callable
 from contextlib import AsyncExitStack, asynccontextmanager
 from functools import partial
 from typing import Any, NotRequired, Protocol
@@ -10,11 +13,12 @@ from typing import Any, NotRequired, Protocol
 import aiohttp
 import aiohttp_client_cache
 import aiohttp_client_cache.session
+import attrs
+import yarl
+from aiohttp_client_cache.cache_control import CacheActions, ExpirationTime
+from aiohttp_client_cache.response import AnyResponse, CachedResponse
 from typing_extensions import TypedDict
 
-type CachedSession = aiohttp_client_cache.session.CachedSession
-
-
 _USER_AGENT = 'instawow (+https://github.com/layday/instawow)'
 
 _DEFAULT_EXPIRE = 0  # Do not cache by default.
@@ -23,6 +27,141 @@ CACHE_INDEFINITELY = -1
 _PROGRESS_TICK_INTERVAL = 0.1
 
 
+def _is_revalidatable(response: CachedResponse) -> bool:
+    return response.method == aiohttp.hdrs.METH_GET and (
+        aiohttp.hdrs.ETAG in response.headers or aiohttp.hdrs.LAST_MODIFIED in response.headers
+    )
+
+
+@attrs.define
+class _HostCacheActions(CacheActions):
+    host: str | None = None
+
+
+class _CacheBackend(aiohttp_client_cache.CacheBackend):
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.record_lookup: Callable[[str, bool], None] | None = None
+
+    def create_cache_actions(
+        self, key: str, url: aiohttp.client.StrOrURL, **kwargs: Any
+    ) -> CacheActions:
+        # The host is carried on the actions for ``request`` to record the lookup against.
+        actions = super().create_cache_actions(key, url, **kwargs)
+        return _HostCacheActions(**attrs.asdict(actions, recurse=False), host=yarl.URL(url).host)
+
+    async def get_response(self, key: str) -> CachedResponse | None:
+        # Expired responses are retained if they can be revalidated
+        # with a conditional request.
+        try:
+            response = await self.responses.read(key) or await self._get_redirect_response(key)
+        except (AttributeError, KeyError, TypeError, pickle.PickleError):
+            response = None
+
+        if response is None:
+            return None
+        elif response.is_expired and _is_revalidatable(response):
+            return response
+        elif not await self.is_cacheable(response):
+            await self.delete(key)
+            return None
+        else:
+            return response
+
+    async def request(self, actions: CacheActions) -> CachedResponse | None:
+        response = await super().request(actions)
+        if response is not None and response.is_expired:
+            actions.revalidate = True
+
+        host = actions.host if isinstance(actions, _HostCacheActions) else None
+        if self.record_lookup and host and not actions.skip_read:
+            self.record_lookup(host, response is not None and not actions.revalidate)
+
+        return response
+
+
+# aiohttp warns against subclassing ``ClientSession``.
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore', DeprecationWarning)
+
+    class CachedSession(aiohttp_client_cache.session.CachedSession):
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            super().__init__(*args, **kwargs)
+            self._in_flight_requests = dict[str, asyncio.Future[CachedResponse | None]]()
+
+        async def _request(
+            self,
+            method: str,
+            str_or_url: aiohttp.client.StrOrURL,
+            expire_after: ExpirationTime = None,
+            refresh: bool = False,
+            **kwargs: Any,
+        ) -> AnyResponse:
+            request = partial(
+                super()._request, method, str_or_url, expire_after, refresh, **kwargs
+            )
+            if method != aiohttp.hdrs.METH_GET or refresh:
+                return await request()
+
+            url = self._resolve_url(str_or_url)
+            key_kwargs = kwargs | {'headers': self._prepare_headers(kwargs.get('headers'))}
+            key = self.cache.create_key(
+                method, url, json_serialize=self._cache_json_serialize, **key_kwargs
+            )
+            actions = self.cache.create_cache_actions(
+                key, url, expire_after=expire_after, **key_kwargs
+            )
+            # Responses which are not cached are streamed to the caller
+            # and can't be shared.
+            if actions.skip_read:
+                return await request()
+
+            # Concurrent requests for the same key wait on the first one
+            # and are each handed a copy of its response.
+            in_flight_request = self._in_flight_requests.get(key)
+            if in_flight_request is not None:
+                shared_response = await asyncio.shield(in_flight_request)
+                if shared_response is None:
+                    return await request()
+                return attrs.evolve(shared_response, content=None)
+
+            in_flight_request = self._in_flight_requests[key] = (
+                asyncio.get_running_loop().create_future()
+            )
+            shared_response = None
+            try:
+                response = await request()
+                if isinstance(response, CachedResponse):
+                    shared_response = response
+                elif response._body is not None:  # pyright: ignore[reportPrivateUsage]
+                    # The body has been read in and saved to the cache.
+                    shared_response = await CachedResponse.from_client_response(
+                        response, actions.expires
+                    )
+                return response
+            finally:
+                del self._in_flight_requests[key]
+                in_flight_request.set_result(shared_response)
+
+        async def _refresh_cached_response(
+            self,
+            method: str,
+            str_or_url: aiohttp.client.StrOrURL,
+            cached_response: CachedResponse,
+            actions: CacheActions,
+            **kwargs: Any,
+        ) -> tuple[bool, AnyResponse]:
+            from_cache, response = await super()._refresh_cached_response(
+                method, str_or_url, cached_response, actions, **kwargs
+            )
+            # Renew the freshness of a response which was revalidated
+            # with a 304 Not Modified, whether or not it had expired.
+            if from_cache and _is_revalidatable(cached_response):
+                cached_response.expires = actions.expires
+                await self.cache.responses.write(actions.key, cached_response)
+            return from_cache, response
+
+
 class _TraceConfigCtx[TraceRequestCtxT](Protocol):  # pragma: no cover
     trace_request_ctx: TraceRequestCtxT | None
 
@@ -98,10 +237,13 @@ def get_ssl_context(cloudflare_compat: bool = False) -> ssl.SSLContext:
 
 @asynccontextmanager
 async def init_web_client(
-    parent_dir: os.PathLike[str] | None, *, with_progress: bool = False
+    parent_dir: os.PathLike[str] | None,
+    *,
+    with_progress: bool = False,
+    max_cache_size: int | None = None,
 ) -> AsyncGenerator[CachedSession]:
     make_client_session = partial(
-        aiohttp_client_cache.session.CachedSession,
+        CachedSession,
         connector=aiohttp.TCPConnector(limit_per_host=20, ssl=get_ssl_context()),
         headers={'User-Agent': _USER_AGENT},
         timeout=aiohttp.ClientTimeout(connect=60, sock_connect=10, sock_read=20),
@@ -117,7 +259,7 @@ async def init_web_client(
                 make_client_session, trace_configs=[progress_trace_config]
             )
 
-        cache_backend = aiohttp_client_cache.CacheBackend(
+        cache_backend = _CacheBackend(
             allowed_codes=(
                 200,
                 206,  # Partial Content - returned for successful range requests
@@ -135,7 +277,8 @@ async def init_web_client(
             (
                 cache_backend.responses,
                 cache_backend.redirects,
-            ) = await async_exit_stack.enter_async_context(make_cache(parent_dir))
+                cache_backend.record_lookup,
+            ) = await async_exit_stack.enter_async_context(make_cache(parent_dir, max_cache_size))
 
         client_session = await async_exit_stack.enter_async_context(
             make_client_session(cache=cache_backend)
@@ -4,19 +4,418 @@ import asyncio
 import concurrent.futures
 import contextlib
 import os
-from collections.abc import Callable, Set
+import pickle
+import secrets
+import shutil
+import sqlite3
+import threading
+import time
+from collections import Counter
+from collections.abc import AsyncIterator, Callable, Collection, Iterable, Iterator, Set
 from functools import partial
-from typing import Never
+from pathlib import Path
+from typing import NamedTuple
 
 import aiohttp_client_cache
-import diskcache
+import attrs
+from aiohttp_client_cache.response import CachedResponse
 
-_http_cache_name = '_http_v1'
+_http_cache_name = '_http_v2'
+_stale_http_cache_names = ['_http_v1']
+
+_INDEX_NAME = 'index.sqlite'
+_BODIES_DIR_NAME = 'bodies'
+
+_MAX_CACHE_THREADS = 8
+
+# The cache is trimmed to this fraction of its maximum size when it
+# overflows so that eviction does not kick in on every write.
+_EVICTION_LOW_WATER_MARK = 0.9
+
+# Body files which are not referenced from the index are only swept
+# once they're this old, in case they belong to an uncommitted write.
+_ORPHANED_BODY_GRACE_PERIOD = 60 * 60
+
+_SCHEMA = """\
+CREATE TABLE IF NOT EXISTS entry (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    body_name TEXT,
+    size INTEGER NOT NULL,
+    host TEXT,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entry_accessed_at ON entry (accessed_at);
+CREATE TABLE IF NOT EXISTS host_lookup (
+    host TEXT NOT NULL PRIMARY KEY,
+    hits INTEGER NOT NULL,
+    misses INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class HostStats(NamedTuple):
+    host: str | None
+    entries: int
+    size: int
+    hits: int
+    misses: int
+
+
+@contextlib.contextmanager
+def _transact(connection: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        yield connection
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+    else:
+        connection.execute('COMMIT')
+
+
+class CacheStore:
+    """Response metadata is kept in a SQLite index and bodies in separate files.
+
+    Every thread is given its own connection to the index, which is in WAL mode,
+    so that reads can go ahead while another thread is writing.  Bodies are
+    written out under a unique name and renamed into place before they are
+    referenced from the index; files are never modified once they have been
+    written, only replaced and deleted.
+
+    Access times and host hit rates are tallied in memory and written
+    out together with the next write to the index.  Once the cache grows
+    past ``max_size`` bytes, least recently used entries are evicted.
+    """
+
+    def __init__(self, path: Path, max_size: int | None = None) -> None:
+        self.path = path
+        self.body_dir_path = path / _BODIES_DIR_NAME
+        self.max_size = max_size
+        self._local = threading.local()
+        self._connections = list[sqlite3.Connection]()
+        self._lock = threading.Lock()
+        self._pending_accesses = dict[tuple[str, str], float]()
+        self._pending_lookups = Counter[tuple[str, bool]]()
+        self._estimated_size = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        connection: sqlite3.Connection | None = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path / _INDEX_NAME,
+                isolation_level=None,
+                check_same_thread=False,
+                timeout=60,
+            )
+            connection.execute('PRAGMA synchronous = NORMAL')
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def open(self) -> None:
+        self.body_dir_path.mkdir(parents=True, exist_ok=True)
+        connection = self._connect()
+        connection.execute('PRAGMA journal_mode = WAL')
+        connection.executescript(_SCHEMA)
+
+        ((self._estimated_size,),) = connection.execute('SELECT coalesce(sum(size), 0) FROM entry')
+        if self.max_size is not None and self._estimated_size > self.max_size:
+            self._evict(self.max_size)
+
+        for stale_name in _stale_http_cache_names:
+            shutil.rmtree(self.path.parent / stale_name, ignore_errors=True)
+
+    def close(self) -> None:
+        try:
+            if self._pending_accesses or self._pending_lookups:
+                with _transact(self._connect()) as connection:
+                    self._flush_pending(connection)
+        finally:
+            with self._lock:
+                for connection in self._connections:
+                    connection.close()
+                self._connections.clear()
+
+    def _flush_pending(self, connection: sqlite3.Connection) -> None:
+        with self._lock:
+            accesses = self._pending_accesses
+            lookups = self._pending_lookups
+            self._pending_accesses = {}
+            self._pending_lookups = Counter()
+
+        connection.executemany(
+            """\
+            UPDATE entry SET accessed_at = max(accessed_at, ?)
+            WHERE namespace = ? AND key = ?
+            """,
+            ((t, n, k) for (n, k), t in accesses.items()),
+        )
+        connection.executemany(
+            """\
+            INSERT INTO host_lookup (host, hits, misses) VALUES (?, ?, ?)
+            ON CONFLICT (host) DO UPDATE SET
+                hits = hits + excluded.hits, misses = misses + excluded.misses
+            """,
+            ((h, c if i else 0, 0 if i else c) for (h, i), c in lookups.items()),
+        )
+
+    def _write_body(self, body: bytes) -> str:
+        body_name = secrets.token_hex(16)
+        temp_body_path = self.body_dir_path / f'{body_name}.tmp'
+        temp_body_path.write_bytes(body)
+        os.replace(temp_body_path, self.body_dir_path / body_name)
+        return body_name
+
+    def _remove_bodies(self, body_names: Iterable[str | None]) -> None:
+        # Bodies which can't be removed, e.g. because they are open
+        # on Windows, are left for ``prune`` to sweep up.
+        for body_name in body_names:
+            if body_name:
+                with contextlib.suppress(OSError):
+                    (self.body_dir_path / body_name).unlink()
+
+    def _delete_entries(
+        self, connection: sqlite3.Connection, keys: Iterable[tuple[str, str]]
+    ) -> tuple[list[str | None], int]:
+        deleted = [
+            r
+            for n, k in keys
+            for r in connection.execute(
+                'DELETE FROM entry WHERE namespace = ? AND key = ? RETURNING body_name, size',
+                (n, k),
+            )
+        ]
+        deleted_size = sum(s for _, s in deleted)
+        with self._lock:
+            self._estimated_size -= deleted_size
+        return [b for b, _ in deleted], deleted_size
+
+    def _select_lru_entries(
+        self, connection: sqlite3.Connection, target_size: float, keep: tuple[str, str] | None
+    ) -> list[tuple[str, str]]:
+        ((total_size,),) = connection.execute('SELECT coalesce(sum(size), 0) FROM entry')
+        with self._lock:
+            self._estimated_size = total_size
+
+        selected_keys = list[tuple[str, str]]()
+        for namespace, key, size in connection.execute(
+            'SELECT namespace, key, size FROM entry ORDER BY accessed_at'
+        ):
+            if total_size <= target_size:
+                break
+            if (namespace, key) != keep:
+                selected_keys.append((namespace, key))
+                total_size -= size
+        return selected_keys
+
+    def _evict(self, max_size: int, keep: tuple[str, str] | None = None) -> None:
+        with _transact(self._connect()) as connection:
+            self._flush_pending(connection)
+            body_names, _ = self._delete_entries(
+                connection,
+                self._select_lru_entries(connection, max_size * _EVICTION_LOW_WATER_MARK, keep),
+            )
+        self._remove_bodies(body_names)
+
+    def record_lookup(self, host: str, hit: bool) -> None:
+        with self._lock:
+            self._pending_lookups[host, hit] += 1
+
+    def read(self, namespace: str, key: str) -> aiohttp_client_cache.ResponseOrKey:
+        row = (
+            self._connect()
+            .execute(
+                'SELECT value, body_name FROM entry WHERE namespace = ? AND key = ?',
+                (namespace, key),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+
+        value, body_name = row
+        item = pickle.loads(value)
+        if body_name:
+            try:
+                body = (self.body_dir_path / body_name).read_bytes()
+            except FileNotFoundError:
+                # The entry was replaced or deleted in between.
+                return None
+            item = attrs.evolve(item, body=body)
+
+        with self._lock:
+            self._pending_accesses[namespace, key] = time.time()
+
+        return item
+
+    def write(self, namespace: str, key: str, item: aiohttp_client_cache.ResponseOrKey) -> None:
+        body_name = None
+        body_size = 0
+        host = None
+        if isinstance(item, CachedResponse):
+            body = item._body  # pyright: ignore[reportPrivateUsage]
+            if body is not None:
+                body_name = self._write_body(body)
+                body_size = len(body)
+            host = item.url.host
+            item = attrs.evolve(item, body=None, content=None)
+
+        value = pickle.dumps(item)
+        size = len(value) + body_size
+        now = time.time()
+
+        try:
+            with _transact(self._connect()) as connection:
+                replaced_body_names, _ = self._delete_entries(connection, [(namespace, key)])
+                connection.execute(
+                    'INSERT INTO entry VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (namespace, key, value, body_name, size, host, now, now),
+                )
+                self._flush_pending(connection)
+        except BaseException:
+            self._remove_bodies([body_name])
+            raise
+
+        with self._lock:
+            self._estimated_size += size
+            estimated_size = self._estimated_size
+
+        self._remove_bodies(replaced_body_names)
+
+        if self.max_size is not None and estimated_size > self.max_size:
+            self._evict(self.max_size, keep=(namespace, key))
+
+    def delete(self, namespace: str, keys: Iterable[str]) -> None:
+        with _transact(self._connect()) as connection:
+            body_names, _ = self._delete_entries(connection, ((namespace, k) for k in keys))
+        self._remove_bodies(body_names)
+
+    def contains(self, namespace: str, key: str) -> bool:
+        return (
+            self._connect()
+            .execute(
+                'SELECT 1 FROM entry WHERE namespace = ? AND key = ?',
+                (namespace, key),
+            )
+            .fetchone()
+            is not None
+        )
+
+    def keys(self, namespace: str) -> list[str]:
+        return [
+            k
+            for (k,) in self._connect().execute(
+                'SELECT key FROM entry WHERE namespace = ?', (namespace,)
+            )
+        ]
+
+    def size(self, namespace: str) -> int:
+        ((size,),) = self._connect().execute(
+            'SELECT count(*) FROM entry WHERE namespace = ?', (namespace,)
+        )
+        return size
+
+    def prune(
+        self,
+        *,
+        unused_for: float | None = None,
+        max_size: int | None = None,
+        hosts: Collection[str] = (),
+    ) -> tuple[int, int]:
+        """Remove entries which have not been used in ``unused_for`` seconds or
+        which belong to any of ``hosts``, and then the least recently used entries
+        in excess of ``max_size`` bytes.  Body files which have been left behind
+        are swept up too.  Returns the number and size of removed entries.
+        """
+        with _transact(self._connect()) as connection:
+            self._flush_pending(connection)
+
+            conditions = list[str]()
+            params = list[object]()
+            if unused_for is not None:
+                conditions.append('accessed_at < ?')
+                params.append(time.time() - unused_for)
+            if hosts:
+                conditions.append(f'host IN ({", ".join("?" * len(hosts))})')
+                params.extend(hosts)
+
+            selected_keys = (
+                connection.execute(
+                    f'SELECT namespace, key FROM entry WHERE {" OR ".join(conditions)}', params
+                ).fetchall()
+                if conditions
+                else []
+            )
+            body_names, pruned_size = self._delete_entries(connection, selected_keys)
+
+            if max_size is not None:
+                lru_keys = self._select_lru_entries(connection, max_size, None)
+                lru_body_names, lru_size = self._delete_entries(connection, lru_keys)
+                selected_keys += lru_keys
+                body_names += lru_body_names
+                pruned_size += lru_size
+
+            referenced_body_names = {
+                b for (b,) in connection.execute('SELECT body_name FROM entry') if b
+            }
+
+        self._remove_bodies(body_names)
+
+        orphan_cutoff = time.time() - _ORPHANED_BODY_GRACE_PERIOD
+        with os.scandir(self.body_dir_path) as body_entries:
+            for body_entry in body_entries:
+                with contextlib.suppress(OSError):
+                    if (
+                        body_entry.name.removesuffix('.tmp') not in referenced_body_names
+                        and body_entry.stat().st_mtime < orphan_cutoff
+                    ):
+                        os.unlink(body_entry.path)
+
+        return len(selected_keys), pruned_size
+
+    def get_host_stats(self) -> list[HostStats]:
+        "Tally up entries and lookups by host."
+        with _transact(self._connect()) as connection:
+            self._flush_pending(connection)
+            return [
+                HostStats(*r)
+                for r in connection.execute(
+                    """\
+                    SELECT host, sum(entries), sum(size), sum(hits), sum(misses)
+                    FROM (
+                        SELECT host, count(*) AS entries, sum(size) AS size,
+                            0 AS hits, 0 AS misses
+                        FROM entry
+                        GROUP BY host
+                        UNION ALL
+                        SELECT host, 0, 0, hits, misses
+                        FROM host_lookup
+                    )
+                    GROUP BY host
+                    ORDER BY host
+                    """
+                )
+            ]
+
+
+@contextlib.contextmanager
+def open_cache_store(parent_dir: os.PathLike[str], max_size: int | None = None):
+    store = CacheStore(Path(parent_dir, _http_cache_name), max_size)
+    store.open()
+    try:
+        yield store
+    finally:
+        store.close()
 
 
 @contextlib.asynccontextmanager
-async def make_cache(parent_dir: os.PathLike[str]):
-    with concurrent.futures.ThreadPoolExecutor(1, '_http_cache') as executor:
+async def make_cache(parent_dir: os.PathLike[str], max_size: int | None = None):
+    with concurrent.futures.ThreadPoolExecutor(_MAX_CACHE_THREADS, '_http_cache') as executor:
         loop = asyncio.get_running_loop()
 
         def run_in_thread2[**P, T](fn: Callable[P, T]):
@@ -25,52 +424,49 @@ async def make_cache(parent_dir: os.PathLike[str]):
 
             return wrapper
 
-        # diskcache will only close the sqlite connection if it was initialised
-        # in the same thread.
-        cache = await run_in_thread2(diskcache.Cache)(os.path.join(parent_dir, _http_cache_name))
+        store = CacheStore(Path(parent_dir, _http_cache_name), max_size)
+        await run_in_thread2(store.open)()
 
-        def make_cache_wrapper(prefix: str):
+        def make_cache_wrapper(namespace: str):
             class Cache(aiohttp_client_cache.BaseCache):
-                @run_in_thread2
-                def bulk_delete(self, keys: Set[str]):
-                    for key in keys:
-                        cache.delete((prefix, key))
+                async def bulk_delete(self, keys: Set[str]):
+                    await run_in_thread2(store.delete)(namespace, keys)
 
-                @run_in_thread2
-                def contains(self, key: str):
-                    return (prefix, key) in cache
+                async def contains(self, key: str):
+                    return await run_in_thread2(store.contains)(namespace, key)
 
-                @run_in_thread2
-                def delete(self, key: str):
-                    cache.delete((prefix, key))
+                async def delete(self, key: str):
+                    await run_in_thread2(store.delete)(namespace, [key])
 
-                @run_in_thread2
-                def read(self, key: str):
-                    return cache.get((prefix, key))
+                async def read(self, key: str):
+                    return await run_in_thread2(store.read)(namespace, key)
 
-                @run_in_thread2
-                def write(self, key: str, item: aiohttp_client_cache.ResponseOrKey):
-                    cache[prefix, key] = item
+                async def write(self, key: str, item: aiohttp_client_cache.ResponseOrKey):
+                    await run_in_thread2(store.write)(namespace, key, item)
 
-                async def clear(self) -> Never:
-                    raise NotImplementedError
+                async def clear(self):
+                    await self.bulk_delete(set(await run_in_thread2(store.keys)(namespace)))
 
-                async def keys(self):
-                    if False:  # pragma: no cover
-                        yield
-                    raise NotImplementedError
+                async def keys(self) -> AsyncIterator[str]:
+                    for key in await run_in_thread2(store.keys)(namespace):
+                        yield key
 
-                async def values(self):
-                    if False:  # pragma: no cover
-                        yield
-                    raise NotImplementedError
+                async def values(self) -> AsyncIterator[aiohttp_client_cache.ResponseOrKey]:
+                    async for key in self.keys():
+                        value = await self.read(key)
+                        if value is not None:
+                            yield value
 
-                async def size(self) -> Never:
-                    raise NotImplementedError
+                async def size(self):
+                    return await run_in_thread2(store.size)(namespace)
 
             return Cache()
 
         try:
-            yield make_cache_wrapper('responses'), make_cache_wrapper('redirects')
+            yield (
+                make_cache_wrapper('responses'),
+                make_cache_wrapper('redirects'),
+                store.record_lookup,
+            )
         finally:
-            await run_in_thread2(cache.close)()
+            await run_in_thread2(store.close)()
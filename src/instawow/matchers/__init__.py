@@ -1,15 +1,19 @@
 from __future__ import annotations
 
+import json
 import os
 import re
-from collections.abc import Awaitable, Iterable, Mapping
-from itertools import chain, product
+from collections.abc import Awaitable, Iterable, Iterator, Mapping, Set
+from contextlib import contextmanager
+from itertools import product
 from pathlib import Path
-from typing import Protocol, Self
+from typing import Literal, Protocol, Self
 
 import attrs
 
 from .. import ctx
+from .._logging import logger
+from .._utils.aio import gather, run_in_thread
 from .._utils.attrs import fauxfrozen
 from .._utils.iteration import bucketise, merge_intersecting_sets, uniq
 from ..catalogue import synchronise as synchronise_catalogue
@@ -17,6 +21,8 @@ from ..definitions import Defn
 from ..wow_installations import Flavour, FlavourTocSuffixes, to_flavour
 from .addon_toc import TocReader
 
+type ReconcileOutcome = Literal['skipped', 'unmatched']
+
 
 class Matcher(Protocol):  # pragma: no cover
     def __call__(
@@ -32,6 +38,59 @@ NORMALISED_FLAVOUR_TOC_EXTENSIONS = {
     k: tuple(i.lower() for i in v) for k, v in _FLAVOUR_TOC_EXTENSIONS.items()
 }
 
+# Scanning is I/O-bound and mostly syscall latency on network and Wine file systems.
+_MAX_SCAN_WORKERS = 8
+
+
+class TocCache:
+    "Parsed TOC files keyed on folder path, which are only re-read if they've changed."
+
+    def __init__(self, cached_tocs: Mapping[str, tuple[str, int, int, str]]) -> None:
+        self._cached_tocs = cached_tocs
+        self.changed_tocs = dict[str, tuple[str, int, int, str]]()
+
+    def read(self, folder_path: Path, toc_entry: os.DirEntry[str]) -> TocReader:
+        toc_stat = toc_entry.stat()
+        toc_key = (toc_entry.name, toc_stat.st_mtime_ns, toc_stat.st_size)
+
+        cached_toc = self._cached_tocs.get(str(folder_path))
+        if cached_toc is not None and cached_toc[:3] == toc_key:
+            return TocReader.from_entries(json.loads(cached_toc[3]))
+
+        toc_reader = TocReader.from_path(Path(toc_entry))
+        self.changed_tocs[str(folder_path)] = (*toc_key, json.dumps(dict(toc_reader)))
+        return toc_reader
+
+
+@contextmanager
+def open_toc_cache(retained_folder_paths: Set[str] | None = None) -> Iterator[TocCache]:
+    "Load the TOC cache from the database and persist any changes on exit."
+    from ..pkg_db import transact, use_tuple_factory
+
+    with ctx.config.database() as connection:
+        with use_tuple_factory(connection) as cursor:
+            cached_tocs = {
+                f: (n, m, s, e)
+                for f, n, m, s, e in cursor.execute(
+                    'SELECT folder_path, toc_name, toc_mtime_ns, toc_size, entries FROM addon_toc'
+                )
+            }
+
+        toc_cache = TocCache(cached_tocs)
+        yield toc_cache
+
+        with transact(connection) as transaction:
+            transaction.executemany(
+                'INSERT OR REPLACE INTO addon_toc '
+                '(folder_path, toc_name, toc_mtime_ns, toc_size, entries) VALUES (?, ?, ?, ?, ?)',
+                [(f, *t) for f, t in toc_cache.changed_tocs.items()],
+            )
+            if retained_folder_paths is not None:
+                transaction.executemany(
+                    'DELETE FROM addon_toc WHERE folder_path = ?',
+                    [(f,) for f in cached_tocs.keys() - retained_folder_paths],
+                )
+
 
 @fauxfrozen(order=True)
 class AddonFolder:
@@ -43,17 +102,28 @@ class AddonFolder:
         object.__setattr__(self, 'name', self.path.name)
 
     @classmethod
-    def from_path(cls, flavour: Flavour, parent_path: Path) -> Self | None:
-        suffixes = tuple(chain(NORMALISED_FLAVOUR_TOC_EXTENSIONS[flavour], ('.toc',)))
+    def from_path(
+        cls, flavour: Flavour, parent_path: Path, toc_cache: TocCache | None = None
+    ) -> Self | None:
+        flavour_suffixes = NORMALISED_FLAVOUR_TOC_EXTENSIONS[flavour]
 
+        # Prefer a flavour-suffixed TOC over the bare TOC in a single pass.
+        match = None
         with os.scandir(parent_path) as iter_parent_dir:
-            match = next(
-                (c for c in iter_parent_dir if c.name.lower().endswith(suffixes)),
-                None,
-            )
+            for entry in iter_parent_dir:
+                normalised_name = entry.name.lower()
+                if normalised_name.endswith(flavour_suffixes):
+                    match = entry
+                    break
+                elif match is None and normalised_name.endswith('.toc'):
+                    match = entry
 
         if match is not None:
-            toc_reader = TocReader.from_path(Path(match))
+            toc_reader = (
+                TocReader.from_path(Path(match))
+                if toc_cache is None
+                else toc_cache.read(parent_path, match)
+            )
             return cls(parent_path, toc_reader)
 
     def get_defns_from_toc_keys(self, keys_and_ids: Iterable[tuple[str, str]]) -> frozenset[Defn]:
@@ -62,26 +132,105 @@ class AddonFolder:
         )
 
 
-def _get_unreconciled_folders():
+def _get_unreconciled_folders(exclude_settled: bool):
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
     config = ctx.config.config()
     flavour = config.product['flavour']
 
     with ctx.config.database() as connection:
         pkg_folders = [n for (n,) in connection.execute('SELECT name FROM pkg_folder').fetchall()]
+        if exclude_settled:
+            settled_folders = dict[str, tuple[str, int, str]](
+                (n, (i, m, t))
+                for n, i, m, t in connection.execute(
+                    'SELECT name, inode, mtime_ns, toc_signature FROM addon_folder_snapshot'
+                ).fetchall()
+            )
+        else:
+            settled_folders = {}
+
+    with os.scandir(config.addon_dir) as iter_addon_dir:
+        folder_entries = list(iter_addon_dir)
+
+    unreconciled_folder_paths = [
+        Path(e)
+        for e in folder_entries
+        if e.name not in pkg_folders
+        and e.is_dir(follow_symlinks=False)
+        and (e.name not in settled_folders or settled_folders[e.name] != _get_snapshot_key(e.path))
+    ]
 
-    unreconciled_folder_paths = (
-        p
-        for p in config.addon_dir.iterdir()
-        if p.name not in pkg_folders and p.is_dir() and not p.is_symlink()
-    )
-    for path in unreconciled_folder_paths:
-        addon_folder = AddonFolder.from_path(flavour, path)
-        if addon_folder:
-            yield addon_folder
+    with (
+        open_toc_cache({e.path for e in folder_entries}) as toc_cache,
+        ThreadPoolExecutor(_MAX_SCAN_WORKERS, 'scan_addon_folders') as executor,
+    ):
+        for future in as_completed(
+            executor.submit(AddonFolder.from_path, flavour, p, toc_cache)
+            for p in unreconciled_folder_paths
+        ):
+            addon_folder = future.result()
+            if addon_folder:
+                yield addon_folder
+
+
+def get_unreconciled_folders(*, exclude_settled: bool = False) -> frozenset[AddonFolder]:
+    """Collect add-on folders which are not owned by any installed package.
+
+    If ``exclude_settled`` is true, folders which were left unreconciled
+    on a previous run and have not changed since are omitted.
+    """
+    return frozenset(_get_unreconciled_folders(exclude_settled))
 
 
-def get_unreconciled_folders() -> frozenset[AddonFolder]:
-    return frozenset(_get_unreconciled_folders())
+def _get_snapshot_key(folder_path: str) -> tuple[str, int, str]:
+    folder_stat = os.stat(folder_path, follow_symlinks=False)
+
+    # Overwriting a file does not change the mtime of its folder but
+    # add-on updates will have rewritten their TOC files.
+    with os.scandir(folder_path) as iter_folder:
+        toc_stats = sorted(
+            (e.name, e.stat()) for e in iter_folder if e.name.lower().endswith('.toc')
+        )
+    toc_signature = '/'.join(f'{n}:{s.st_mtime_ns}:{s.st_size}' for n, s in toc_stats)
+
+    # Inode numbers can overflow SQLite's signed 64-bit integers.
+    return (str(folder_stat.st_ino), folder_stat.st_mtime_ns, toc_signature)
+
+
+def record_reconcile_outcomes(outcomes: Mapping[AddonFolder, ReconcileOutcome]) -> None:
+    """Remember which folders were left unreconciled and why.
+
+    Snapshots of folders which have since been claimed by a package
+    or removed from the add-on directory are discarded.
+    """
+    from ..pkg_db import transact
+
+    addon_dir = ctx.config.config().addon_dir
+
+    with ctx.config.database() as connection, transact(connection):
+        snapshot_names = [
+            n for (n,) in connection.execute('SELECT name FROM addon_folder_snapshot').fetchall()
+        ]
+        connection.executemany(
+            'DELETE FROM addon_folder_snapshot WHERE name = ?',
+            [(n,) for n in snapshot_names if not (addon_dir / n).is_dir()],
+        )
+        connection.execute(
+            'DELETE FROM addon_folder_snapshot WHERE name IN (SELECT name FROM pkg_folder)'
+        )
+        connection.executemany(
+            """
+            INSERT OR REPLACE INTO addon_folder_snapshot
+            (name, inode, mtime_ns, toc_signature, reconcile_outcome)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            [
+                (f.name, *_get_snapshot_key(str(f.path)), o)
+                for f, o in outcomes.items()
+                if f.path.is_dir()
+            ],
+        )
 
 
 async def _match_toc_source_ids(leftovers: frozenset[AddonFolder]):
@@ -126,13 +275,18 @@ async def _match_folder_name_subsets(leftovers: frozenset[AddonFolder]):
 
     leftovers_by_name = {e.name: e for e in leftovers}
 
+    folder_names = catalogue.folder_names_by_flavour[flavour]
+    matching_folders_indices = sorted(
+        {i for n in leftovers_by_name for i in folder_names.get(n, ())}
+    )
+
     matches = [
-        (frozenset(leftovers_by_name[n] for n in m), Defn(i.source, i.id))
-        for i in catalogue.entries
-        if flavour in i.game_flavours
-        for f in i.folders
-        for m in (f & leftovers_by_name.keys(),)
-        if m
+        (
+            frozenset(leftovers_by_name[n] for n in e.folders[j] & leftovers_by_name.keys()),
+            Defn(e.source, e.id),
+        )
+        for i, j in matching_folders_indices
+        for e in (catalogue.entries[i],)
     ]
 
     merged_folders_by_constituent_folder = {
@@ -166,9 +320,117 @@ async def _match_addon_names_with_folder_names(leftovers: frozenset[AddonFolder]
     return [([a], uniq(Defn(i.source, i.id) for i in m)) for a, m in matches if m]
 
 
+async def _get_cf_fingerprints(folders: Iterable[AddonFolder]) -> dict[AddonFolder, int]:
+    import concurrent.futures
+
+    from ..pkg_db import transact, use_tuple_factory
+    from ._cf_fingerprint import compute_folder_fingerprint, get_tree_signature
+
+    folder_paths = {a: str(a.path) for a in folders}
+
+    @run_in_thread
+    def get_tree_signatures():
+        with concurrent.futures.ThreadPoolExecutor(
+            _MAX_SCAN_WORKERS, 'sign_addon_folders'
+        ) as executor:
+            return dict(zip(folder_paths, executor.map(get_tree_signature, folder_paths.values())))
+
+    @run_in_thread
+    def get_cached_fingerprints():
+        with ctx.config.database() as connection, use_tuple_factory(connection) as cursor:
+            return {
+                f: (s, p)
+                for f, s, p in cursor.execute(
+                    'SELECT folder_path, tree_signature, fingerprint FROM addon_fingerprint'
+                )
+            }
+
+    @run_in_thread
+    def cache_fingerprints(rows: list[tuple[str, str, int]]):
+        with ctx.config.database() as connection, transact(connection) as transaction:
+            transaction.executemany(
+                'INSERT OR REPLACE INTO addon_fingerprint '
+                '(folder_path, tree_signature, fingerprint) VALUES (?, ?, ?)',
+                rows,
+            )
+
+    @run_in_thread
+    def compute_fingerprints(stale_folders: list[AddonFolder]):
+        with concurrent.futures.ThreadPoolExecutor(
+            _MAX_SCAN_WORKERS, 'fingerprint_addon_folders'
+        ) as executor:
+            return list(
+                executor.map(compute_folder_fingerprint, (folder_paths[a] for a in stale_folders))
+            )
+
+    tree_signatures = await get_tree_signatures()
+    cached_fingerprints = await get_cached_fingerprints()
+
+    fingerprints = {
+        a: p
+        for a, f in folder_paths.items()
+        for s, p in (cached_fingerprints.get(f, (None, None)),)
+        if s == tree_signatures[a]
+    }
+    stale_folders = [a for a in folder_paths if a not in fingerprints]
+    if stale_folders:
+        stale_fingerprints = await compute_fingerprints(stale_folders)
+        fingerprints.update(zip(stale_folders, stale_fingerprints))
+        await cache_fingerprints(
+            [
+                (folder_paths[a], tree_signatures[a], p)
+                for a, p in zip(stale_folders, stale_fingerprints)
+            ]
+        )
+
+    return fingerprints
+
+
+async def _match_cf_fingerprints(leftovers: frozenset[AddonFolder]):
+    from .._sources.cfcore import CfCoreResolver
+
+    resolvers = ctx.config.resolvers()
+    resolver = resolvers.get(CfCoreResolver.metadata.id)
+    if (
+        not leftovers
+        or not isinstance(resolver, CfCoreResolver)
+        or resolver.metadata.id in resolvers.disabled_resolver_reasons
+    ):
+        return []
+
+    fingerprints = await _get_cf_fingerprints(leftovers)
+    mod_ids = await resolver.get_fingerprint_matches(frozenset(fingerprints.values()))
+
+    folders_grouped_by_mod_id = bucketise(
+        (a for a in sorted(leftovers) if fingerprints[a] in mod_ids),
+        key=lambda a: mod_ids[fingerprints[a]],
+    )
+    return [(f, [Defn(resolver.metadata.id, i)]) for i, f in folders_grouped_by_mod_id.items()]
+
+
 # In order of increasing heuristicitivenessitude
 DEFAULT_MATCHERS: Mapping[str, Matcher] = {
+    'cf_fingerprints': _match_cf_fingerprints,
     'toc_source_ids': _match_toc_source_ids,
     'folder_name_subsets': _match_folder_name_subsets,
     'addon_names_with_folder_names': _match_addon_names_with_folder_names,
 }
+
+
+async def match_all(
+    leftovers: frozenset[AddonFolder], matchers: Mapping[str, Matcher] = DEFAULT_MATCHERS
+) -> dict[str, list[tuple[list[AddonFolder], list[Defn]]]]:
+    """Run matchers concurrently over the same folders, keeping matcher order.
+
+    A matcher which fails is logged and contributes no matches.
+    """
+
+    async def match(name: str, matcher: Matcher):
+        try:
+            return await matcher(leftovers)
+        except Exception:
+            logger.exception(f'{name} matcher failed')
+            return []
+
+    results = await gather(match(n, m) for n, m in matchers.items())
+    return dict(zip(matchers, results))
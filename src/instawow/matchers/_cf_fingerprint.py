@@ -0,0 +1,124 @@
+"CurseForge add-on folder fingerprinting."
+
+from __future__ import annotations
+
+import hashlib
+import os
+import posixpath
+import re
+import struct
+
+from ..wow_installations import FlavourTocSuffixes
+
+_MURMUR2_M = 0x5BD1E995
+_MURMUR2_SEED = 1
+
+_WHITESPACE = b'\t\n\r '
+
+_TOC_SUFFIXES = {
+    '',
+    *(f'{s}{f.lower()}' for s in '-_' for i in FlavourTocSuffixes for f in i.value),
+}
+
+_TOC_INCLUDE_PATTERN = re.compile(rb'^\s*((?!#)(?:(?!\.\.).)+\.(?:xml|lua))\s*$', re.I | re.M)
+_XML_INCLUDE_PATTERN = re.compile(
+    rb'<(?:Include|Script)\s+file=["\']((?:(?!\.\.).)+?)["\']\s*/>', re.I
+)
+_XML_COMMENT_PATTERN = re.compile(rb'<!--.*?-->', re.S)
+
+
+def murmur2(data: bytes) -> int:
+    "32-bit MurmurHash2 of ``data`` with whitespace removed, as computed by CurseForge."
+    data = data.translate(None, _WHITESPACE)
+    length = len(data)
+    tail_start = length - length % 4
+
+    try:
+        import numpy as np
+    except ModuleNotFoundError:
+        blocks = (
+            (k * _MURMUR2_M) & 0xFFFFFFFF for (k,) in struct.iter_unpack('<I', data[:tail_start])
+        )
+        blocks = (((k ^ k >> 24) * _MURMUR2_M) & 0xFFFFFFFF for k in blocks)
+    else:
+        # Blocks are mixed in bulk, leaving only the sequential fold to Python.
+        m = np.uint32(_MURMUR2_M)
+        block_array = np.frombuffer(data, '<u4', tail_start // 4) * m
+        block_array ^= block_array >> 24
+        blocks = (block_array * m).tolist()
+
+    h = _MURMUR2_SEED ^ length
+    for k in blocks:
+        h = ((h * _MURMUR2_M) & 0xFFFFFFFF) ^ k
+
+    tail = data[tail_start:]
+    if tail:
+        h ^= int.from_bytes(tail, 'little')
+        h = (h * _MURMUR2_M) & 0xFFFFFFFF
+
+    h ^= h >> 13
+    h = (h * _MURMUR2_M) & 0xFFFFFFFF
+    h ^= h >> 15
+    return h
+
+
+def get_tree_signature(folder_path: str) -> str:
+    "Digest of the relative path, mtime and size of every file in a folder."
+    digest = hashlib.blake2b(digest_size=16)
+    for dir_path, dir_names, file_names in os.walk(folder_path):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            file_path = os.path.join(dir_path, file_name)
+            file_stat = os.stat(file_path)
+            digest.update(
+                f'{os.path.relpath(file_path, folder_path)}\0'
+                f'{file_stat.st_mtime_ns}\0{file_stat.st_size}\0'.encode(
+                    'utf-8', 'surrogateescape'
+                )
+            )
+    return digest.hexdigest()
+
+
+def compute_folder_fingerprint(folder_path: str) -> int:
+    """Fingerprint an add-on folder from its TOC files and every file they include.
+
+    Files are looked up case-insensitively.  The fingerprint of the folder
+    is the hash of the concatenated, sorted fingerprints of its files.
+    """
+    file_paths = {
+        os.path.relpath(p, folder_path).replace(os.sep, '/').lower(): p
+        for d, _, f in os.walk(folder_path)
+        for p in (os.path.join(d, n) for n in f)
+    }
+
+    folder_name = os.path.basename(folder_path).lower()
+    root_file_paths = {'bindings.xml', *(f'{folder_name}{s}.toc' for s in _TOC_SUFFIXES)}
+    pending_file_paths = [p for p in file_paths if p in root_file_paths]
+
+    file_fingerprints = dict[str, int]()
+    while pending_file_paths:
+        relative_path = pending_file_paths.pop()
+        if relative_path in file_fingerprints or relative_path not in file_paths:
+            continue
+
+        with open(file_paths[relative_path], 'rb') as file:
+            content = file.read()
+
+        file_fingerprints[relative_path] = murmur2(content)
+
+        if relative_path.endswith('.toc'):
+            includes = _TOC_INCLUDE_PATTERN.findall(content)
+        elif relative_path.endswith('.xml'):
+            includes = _XML_INCLUDE_PATTERN.findall(_XML_COMMENT_PATTERN.sub(b'', content))
+        else:
+            continue
+
+        parent_dir = posixpath.dirname(relative_path)
+        pending_file_paths.extend(
+            posixpath.normpath(
+                posixpath.join(parent_dir, i.decode('utf-8', 'replace').replace('\\', '/'))
+            ).lower()
+            for i in includes
+        )
+
+    return murmur2(''.join(map(str, sorted(file_fingerprints.values()))).encode())
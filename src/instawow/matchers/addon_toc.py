@@ -1,22 +1,56 @@
 from __future__ import annotations
 
+import codecs
+import io
 from collections.abc import Iterator, Mapping
 from functools import cached_property
 from pathlib import Path
-from typing import Self
+from typing import IO, Self
+
+# Directives sit at the top of the file; anything past this is file references.
+_MAX_TOC_HEADER_SIZE = 2**16
+
+
+def _parse_toc_header(file: IO[bytes]) -> dict[str, str]:
+    entries = dict[str, str]()
+    remaining = _MAX_TOC_HEADER_SIZE
+    is_first_line = True
+
+    while remaining > 0:
+        line = file.readline(remaining)
+        if not line:
+            break
+
+        remaining -= len(line)
+        if remaining == 0 and not line.endswith(b'\n'):
+            break
+
+        if is_first_line:
+            line = line.removeprefix(codecs.BOM_UTF8)
+            is_first_line = False
+
+        if line.startswith(b'##'):
+            key, _, value = line.lstrip(b'#').partition(b':')
+            key = key.strip()
+            if key:
+                entries[key.decode('utf-8', 'replace')] = value.strip().decode('utf-8', 'replace')
+        elif line.startswith(b'#') or line.isspace():
+            continue
+        else:
+            break
+
+    return entries
 
 
 class TocReader(Mapping[str, str]):
-    """Extracts key-value pairs from TOC files."""
+    """Extracts key-value pairs from TOC files.
+
+    Parsing stops at the first line which is neither a directive
+    nor a comment.
+    """
 
     def __init__(self, contents: str) -> None:
-        self._entries = {
-            k: v
-            for e in contents.splitlines()
-            if e.startswith('##')
-            for k, v in (map(str.strip, e.lstrip('#').partition(':')[::2]),)
-            if k
-        }
+        self._entries = _parse_toc_header(io.BytesIO(contents.encode()))
 
     def __iter__(self) -> Iterator[str]:
         return iter(self._entries)
@@ -27,13 +61,24 @@ class TocReader(Mapping[str, str]):
     def __len__(self) -> int:
         return len(self._entries)
 
+    @classmethod
+    def from_entries(cls, entries: Mapping[str, str]) -> Self:
+        toc_reader = cls('')
+        toc_reader._entries = dict(entries)
+        return toc_reader
+
+    @classmethod
+    def from_file(cls, file: IO[bytes]) -> Self:
+        return cls.from_entries(_parse_toc_header(file))
+
     @classmethod
     def from_bytes(cls, content: bytes) -> Self:
-        return cls(content.decode(encoding='utf-8-sig', errors='replace'))
+        return cls.from_file(io.BytesIO(content))
 
     @classmethod
     def from_path(cls, path: Path) -> Self:
-        return cls.from_bytes(path.read_bytes())
+        with path.open('rb') as file:
+            return cls.from_file(file)
 
     @cached_property
     def interfaces(self) -> list[int]:
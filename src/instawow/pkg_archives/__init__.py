@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import posixpath
-import zipfile
+import shutil
 from collections.abc import Callable, Generator, Iterable, Iterator, Set
 from contextlib import contextmanager
 from pathlib import Path
@@ -32,14 +32,47 @@ def make_archive_member_filter_fn(base_dirs: Set[str]) -> Callable[[str], bool]:
     return is_subpath
 
 
+# Archives whose members were extracted while downloading, mapped to
+# the staging folder and the CRC and size of every extracted member.
+_streamed_archives = dict[Path, tuple[Path, dict[str, tuple[int, int]]]]()
+
+
+def register_streamed_archive(
+    archive_path: Path, staging_path: Path, members: dict[str, tuple[int, int]]
+) -> None:
+    "Make members extracted ahead of time available to ``open_zip_archive``."
+    _streamed_archives[archive_path] = (staging_path, members)
+
+
 @contextmanager
 def open_zip_archive(archive_path: Path) -> Generator[Archive]:
-    with zipfile.ZipFile(archive_path) as archive:
-        names = archive.namelist()
-        top_level_folders = {h for _, h in find_archive_addon_tocs(names)}
+    from ._mapped import MappedZipFile
+    from ._stream import matches_central_directory
+
+    streamed_archive = _streamed_archives.pop(archive_path, None)
+
+    try:
+        with MappedZipFile(archive_path) as archive:
+            names = archive.namelist()
+            top_level_folders = {h for _, h in find_archive_addon_tocs(names)}
+
+            if streamed_archive and matches_central_directory(archive, streamed_archive[1]):
+                staging_path, _ = streamed_archive
+
+                def extract(parent_path: Path) -> None:
+                    for folder in top_level_folders:
+                        shutil.move(staging_path / folder, parent_path / folder)
+
+            else:
+
+                def extract(parent_path: Path) -> None:
+                    should_extract = make_archive_member_filter_fn(top_level_folders)
+                    for member in archive.infolist():
+                        if should_extract(member.filename):
+                            archive.extract(member, parent_path)
 
-        def extract(parent_path: Path) -> None:
-            should_extract = make_archive_member_filter_fn(top_level_folders)
-            archive.extractall(parent_path, members=(n for n in names if should_extract(n)))
+            yield Archive(top_level_folders, extract)
 
-        yield Archive(top_level_folders, extract)
+    finally:
+        if streamed_archive:
+            shutil.rmtree(streamed_archive[0], ignore_errors=True)
@@ -1,19 +1,26 @@
 from __future__ import annotations
 
-from contextlib import asynccontextmanager, nullcontext
+import hashlib
+import os
+import time
+from collections.abc import AsyncIterable, Awaitable, Callable, Collection, Mapping
+from contextlib import asynccontextmanager, nullcontext, suppress
 from functools import partial
 from pathlib import Path
-from shutil import move
+from shutil import rmtree
 from tempfile import NamedTemporaryFile
 from typing import Literal
 
 from .. import ctx, http
-from .._utils.aio import run_in_thread
+from .._utils.aio import gather, run_in_thread
 from .._utils.file import make_instawowt
 from .._utils.web import file_uri_to_path, is_file_uri
 from ..definitions import Defn
 from ..progress_reporting import Progress
 from ..resolvers import HeadersIntent
+from ..results import PkgArchiveHashMismatch
+from . import register_streamed_archive
+from ._stream import StreamExtractor
 
 
 class PkgDownloadProgress(Progress[Literal['pkg_download'], Literal['bytes']]):
@@ -23,21 +30,59 @@ class PkgDownloadProgress(Progress[Literal['pkg_download'], Literal['bytes']]):
 
 _DOWNLOAD_PKG_LOCK = '_DOWNLOAD_PKG_'
 
+_ARCHIVE_STORE_DIR = 'archives'
+_HASH_CHUNK_SIZE = 2**16
+
+# Stored archives are evicted least recently used first past this size,
+# save for those used in the last hour, which might be about to be installed.
+_MAX_ARCHIVE_STORE_SIZE = 2**29
+_MIN_STORED_ARCHIVE_AGE = 60 * 60
+
 _AsyncNamedTemporaryFile = run_in_thread(NamedTemporaryFile)
-_move_async = run_in_thread(move)
 _make_instawowt_async = run_in_thread(make_instawowt)
+_remove_tree_async = run_in_thread(partial(rmtree, ignore_errors=True))
+
+
+@run_in_thread
+def _store_archive(source: Path, destination: Path) -> None:
+    store_path = destination.parent
+    store_path.mkdir(exist_ok=True)
+    os.replace(source, destination)
+
+    stored_archives = list[tuple[float, int, str]]()
+    for entry in os.scandir(store_path):
+        # Archives may be evicted from under us by a concurrent download.
+        with suppress(FileNotFoundError):
+            entry_stat = entry.stat()
+            stored_archives.append((entry_stat.st_mtime, entry_stat.st_size, entry.path))
+
+    stored_archives.sort(reverse=True)
+    evict_before = time.time() - _MIN_STORED_ARCHIVE_AGE
+    store_size = 0
+    for mtime, size, path in stored_archives:
+        store_size += size
+        if store_size > _MAX_ARCHIVE_STORE_SIZE and mtime < evict_before:
+            with suppress(OSError):
+                os.unlink(path)
+
 
 _alt_ssl_context = http.get_ssl_context(cloudflare_compat=True)
 
 
 @asynccontextmanager
-async def _open_temp_writer_async():
+async def _open_temp_writer_async(update_digests: Collection[Callable[[bytes], None]] = ()):
     fh = await _AsyncNamedTemporaryFile(
         delete=False, dir=await _make_instawowt_async(), prefix='download-'
     )
     path = Path(fh.name)
+
+    def write(chunk: bytes):
+        fh.write(chunk)
+        for update_digest in update_digests:
+            update_digest(chunk)
+
     try:
-        yield (path, run_in_thread(fh.write))
+        yield (path, run_in_thread(write))
     except BaseException:
         await run_in_thread(fh.close)()
         await run_in_thread(path.unlink)()
@@ -46,15 +91,55 @@ async def _open_temp_writer_async():
         await run_in_thread(fh.close)()
 
 
-async def download_pkg_archive(defn: Defn, download_url: str) -> Path:
+def _get_usable_hashes(hashes: Mapping[str, str]) -> dict[str, str]:
+    return {a: v.lower() for a, v in hashes.items() if a in hashlib.algorithms_available}
+
+
+@run_in_thread
+def _check_stored_archive(archive_path: Path, hashes: Mapping[str, str]) -> bool:
+    try:
+        file = archive_path.open('rb')
+    except FileNotFoundError:
+        return False
+
+    hashers = {a: hashlib.new(a) for a in hashes}
+    with file:
+        while chunk := file.read(_HASH_CHUNK_SIZE):
+            for hasher in hashers.values():
+                hasher.update(chunk)
+
+    if all(h.hexdigest() == hashes[a] for a, h in hashers.items()):
+        # Mark the archive as recently used.
+        archive_path.touch()
+        return True
+
+    return False
+
+
+async def download_pkg_archive(
+    defn: Defn, download_url: str, hashes: Mapping[str, str] = {}
+) -> Path:
     if is_file_uri(download_url):
         return Path(file_uri_to_path(download_url))
 
-    async with ctx.sync.locks()[_DOWNLOAD_PKG_LOCK, download_url]:
+    hashes = _get_usable_hashes(hashes)
+
+    # Archives with a known digest are stored under it, which lets
+    # identical archives be reused no matter where they were downloaded from.
+    # These are not also kept in the HTTP cache.
+    archive_path = None
+    if hashes:
+        algorithm, digest = min(hashes.items())
+        archive_path = await _make_instawowt_async() / _ARCHIVE_STORE_DIR / f'{algorithm}-{digest}'
+
+    async with ctx.sync.locks()[_DOWNLOAD_PKG_LOCK, archive_path or download_url]:
+        if archive_path and await _check_stored_archive(archive_path, hashes):
+            return archive_path
+
         make_request = partial(
             ctx.http.web_client().get,
             download_url,
-            expire_after=http.CACHE_INDEFINITELY,
+            expire_after=None if archive_path else http.CACHE_INDEFINITELY,
             headers=ctx.config.resolvers()[defn.source].make_request_headers(
                 intent=HeadersIntent.Download
             ),
@@ -85,8 +170,60 @@ async def download_pkg_archive(defn: Defn, download_url: str) -> Path:
             async with repeat_request() as response:
                 response.raise_for_status()
 
-                async with _open_temp_writer_async() as (temp_path, write):
-                    async for chunk, _ in response.content.iter_chunks():
-                        await write(chunk)
+                hashers = {a: hashlib.new(a) for a in hashes}
+                stream_extractor = None
+
+                async with _open_temp_writer_async([h.update for h in hashers.values()]) as (
+                    temp_path,
+                    write,
+                ):
+                    if ctx.config.config().global_config.stream_extraction:
+                        stream_extractor = await _write_and_extract(
+                            (c async for c, _ in response.content.iter_chunks()), temp_path, write
+                        )
+                    else:
+                        async for chunk, _ in response.content.iter_chunks():
+                            await write(chunk)
+
+                    mismatched_algorithm = next(
+                        (a for a, h in hashers.items() if h.hexdigest() != hashes[a]), None
+                    )
+                    if mismatched_algorithm:
+                        if stream_extractor:
+                            await _remove_tree_async(stream_extractor.staging_path)
+
+                        raise PkgArchiveHashMismatch(mismatched_algorithm)
+
+        if archive_path:
+            await _store_archive(temp_path, archive_path)
+        else:
+            archive_path = temp_path
+
+        if stream_extractor:
+            register_streamed_archive(
+                archive_path, stream_extractor.staging_path, stream_extractor.members
+            )
+
+        return archive_path
+
+
+async def _write_and_extract(
+    chunks: AsyncIterable[bytes], temp_path: Path, write: Callable[[bytes], Awaitable[object]]
+) -> StreamExtractor | None:
+    "Write out the archive and extract its members as they arrive."
+    stream_extractor = StreamExtractor(temp_path.with_name(f'{temp_path.name}-extracted'))
+    feed = run_in_thread(stream_extractor.feed)
+
+    try:
+        async for chunk in chunks:
+            await gather((write(chunk), feed(chunk)))
+    except BaseException:
+        stream_extractor.close()
+        await _remove_tree_async(stream_extractor.staging_path)
+        raise
+
+    stream_extractor.close()
+    if stream_extractor.complete:
+        return stream_extractor
 
-        return temp_path
+    await _remove_tree_async(stream_extractor.staging_path)
@@ -0,0 +1,139 @@
+"Zip archives read through a memory map."
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import zipfile
+import zlib
+from pathlib import Path
+
+_LOCAL_FILE_HEADER = struct.Struct('<4sHHHHHIIIHH')
+_LOCAL_FILE_HEADER_SIGNATURE = b'PK\x03\x04'
+
+_FLAG_ENCRYPTED = 0x1
+
+# Characters which are sanitised by ``zipfile`` on Windows.
+_UNSAFE_NAME_CHARS = frozenset('\\:<>|"?*')
+
+_CHUNK_SIZE = 2**18
+
+
+def is_safe_member_name(name: str) -> bool:
+    "Check that a member name can be joined to a path as is, without sanitisation."
+    parts = name.rstrip('/').split('/')
+    return not _UNSAFE_NAME_CHARS.intersection(name) and not any(
+        p in {'', '.', '..'} for p in parts
+    )
+
+
+def _can_extract_from_mapping(member: zipfile.ZipInfo) -> bool:
+    return (
+        member.compress_type in {zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED}
+        and not member.flag_bits & _FLAG_ENCRYPTED
+        and is_safe_member_name(member.filename)
+    )
+
+
+class MappedZipFile(zipfile.ZipFile):
+    """A read-only ``ZipFile`` backed by a memory map of the archive.
+
+    The central directory is parsed from the mapping and member data is
+    inflated or written out straight from slices of it, without
+    being copied into intermediate buffers.  Members which cannot be
+    sliced out directly are handed off to ``ZipFile``.
+    """
+
+    _mapping: mmap.mmap | None = None
+
+    def __init__(self, archive_path: Path) -> None:
+        with archive_path.open('rb') as file:
+            if not os.fstat(file.fileno()).st_size:
+                raise zipfile.BadZipFile('File is not a zip file')
+
+            self._mapping = mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            super().__init__(mapping)  # pyright: ignore[reportArgumentType]
+        except BaseException:
+            mapping.close()
+            raise
+
+        self.filename = os.fspath(archive_path)
+
+    def close(self) -> None:
+        super().close()
+        if self._mapping is not None:
+            self._mapping.close()
+
+    def extract(
+        self,
+        member: str | zipfile.ZipInfo,
+        path: str | os.PathLike[str] | None = None,
+        pwd: bytes | None = None,
+    ) -> str:
+        if isinstance(member, str):
+            member = self.getinfo(member)
+
+        if path is None or pwd is not None or not _can_extract_from_mapping(member):
+            return super().extract(member, path, pwd)
+
+        target_path = os.path.join(path, *member.filename.rstrip('/').split('/'))
+        if member.is_dir():
+            os.makedirs(target_path, exist_ok=True)
+        else:
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            self._extract_file(member, target_path)
+
+        return target_path
+
+    def _extract_file(self, member: zipfile.ZipInfo, target_path: str) -> None:
+        assert self._mapping is not None
+        (signature, *_, name_length, extra_length) = _LOCAL_FILE_HEADER.unpack_from(
+            self._mapping, member.header_offset
+        )
+        if signature != _LOCAL_FILE_HEADER_SIGNATURE:
+            raise zipfile.BadZipFile(f'Bad magic number for file header: {member.filename!r}')
+
+        data_offset = member.header_offset + _LOCAL_FILE_HEADER.size + name_length + extra_length
+
+        crc = 0
+        size = 0
+        with (
+            memoryview(self._mapping) as mapping_view,
+            mapping_view[data_offset : data_offset + member.compress_size] as data,
+            open(target_path, 'wb') as target,
+        ):
+            decompressor = (
+                zlib.decompressobj(-zlib.MAX_WBITS)
+                if member.compress_type == zipfile.ZIP_DEFLATED
+                else None
+            )
+            for offset in range(0, len(data), _CHUNK_SIZE):
+                with data[offset : offset + _CHUNK_SIZE] as chunk:
+                    if decompressor is None:
+                        crc = zlib.crc32(chunk, crc)
+                        size += target.write(chunk)
+                        continue
+
+                    # Inflate at most a chunk at a time so that a highly compressed
+                    # member is not expanded into memory all at once.
+                    pending: memoryview | bytes = chunk
+                    while pending:
+                        output = decompressor.decompress(pending, _CHUNK_SIZE)
+                        pending = decompressor.unconsumed_tail
+                        crc = zlib.crc32(output, crc)
+                        size += target.write(output)
+                        if size > member.file_size:
+                            raise zipfile.BadZipFile(
+                                f'Inflated size exceeds file size for {member.filename!r}'
+                            )
+
+            if decompressor:
+                output = decompressor.flush()
+                crc = zlib.crc32(output, crc)
+                size += target.write(output)
+
+        if crc != member.CRC or size != member.file_size:
+            raise zipfile.BadZipFile(f'Bad CRC-32 for file {member.filename!r}')
@@ -0,0 +1,241 @@
+"Extraction of zip members from their local file headers while an archive is downloading."
+
+from __future__ import annotations
+
+import struct
+import zipfile
+import zlib
+from pathlib import Path
+from typing import BinaryIO
+
+_LOCAL_FILE_HEADER = struct.Struct('<4sHHHHHIIIHH')
+_LOCAL_FILE_HEADER_SIGNATURE = b'PK\x03\x04'
+_DATA_DESCRIPTOR = struct.Struct('<III')
+_DATA_DESCRIPTOR_SIGNATURE = b'PK\x07\x08'
+
+_FLAG_ENCRYPTED = 0x1
+_FLAG_DATA_DESCRIPTOR = 0x8
+_FLAG_UTF8 = 0x800
+
+_ZIP64_LIMIT = 0xFFFFFFFF
+
+_WRITE_CHUNK_SIZE = 2**16
+
+
+class _UnstreamableArchiveError(Exception):
+    pass
+
+
+def _validate_member_name(name: str) -> None:
+    parts = name.rstrip('/').split('/')
+    if '\\' in name or ':' in parts[0] or any(p in {'', '.', '..'} for p in parts):
+        raise _UnstreamableArchiveError(f'unsafe member name: {name!r}')
+
+
+class _Member:
+    def __init__(
+        self, name: str, file: BinaryIO | None, compress_type: int, compress_size: int | None
+    ):
+        self.name = name
+        self.file = file
+        self.remaining_compress_size = compress_size
+        self.decompressor = (
+            zlib.decompressobj(-zlib.MAX_WBITS) if compress_type == zipfile.ZIP_DEFLATED else None
+        )
+        self.crc = 0
+        self.size = 0
+
+    def write(self, data: bytes) -> None:
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+        if self.file:
+            self.file.write(data)
+
+    def close(self) -> None:
+        if self.file:
+            self.file.close()
+
+
+class StreamExtractor:
+    """Extract members as bytes are fed in, ahead of the central directory.
+
+    Members are written out under ``staging_path``.  Streaming is abandoned
+    if the archive uses a feature which makes it impossible to find member
+    boundaries without the central directory, in which case ``complete``
+    will be false once the stream has been exhausted.
+    """
+
+    def __init__(self, staging_path: Path) -> None:
+        self.staging_path = staging_path
+        self.members = dict[str, tuple[int, int]]()
+        self._buffer = bytearray()
+        self._member: _Member | None = None
+        self._expected_crc: int | None = None
+        self._state = self._read_local_file_header
+        self._failed = False
+        self._reached_central_directory = False
+
+    @property
+    def complete(self) -> bool:
+        return self._reached_central_directory and not self._failed
+
+    def feed(self, data: bytes) -> None:
+        if self._failed or self._reached_central_directory:
+            return
+
+        self._buffer += data
+        try:
+            while self._state():
+                pass
+        except (_UnstreamableArchiveError, OSError, zlib.error):
+            self._fail()
+
+    def close(self) -> None:
+        if not self.complete:
+            self._fail()
+
+    def _fail(self) -> None:
+        self._failed = True
+        self._buffer.clear()
+        if self._member:
+            self._member.close()
+            self._member = None
+
+    def _read_local_file_header(self) -> bool:
+        if len(self._buffer) < len(_LOCAL_FILE_HEADER_SIGNATURE):
+            return False
+
+        if self._buffer[:4] != _LOCAL_FILE_HEADER_SIGNATURE:
+            # Anything other than another member marks the start of the central directory.
+            self._reached_central_directory = True
+            self._buffer.clear()
+            return False
+
+        if len(self._buffer) < _LOCAL_FILE_HEADER.size:
+            return False
+
+        (
+            _,
+            _,
+            flags,
+            compress_type,
+            _,
+            _,
+            crc,
+            compress_size,
+            file_size,
+            name_length,
+            extra_length,
+        ) = _LOCAL_FILE_HEADER.unpack_from(self._buffer)
+
+        header_size = _LOCAL_FILE_HEADER.size + name_length + extra_length
+        if len(self._buffer) < header_size:
+            return False
+
+        if flags & _FLAG_ENCRYPTED:
+            raise _UnstreamableArchiveError('encrypted member')
+        if compress_type not in {zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED}:
+            raise _UnstreamableArchiveError(f'unsupported compression method: {compress_type}')
+        if _ZIP64_LIMIT in {compress_size, file_size}:
+            raise _UnstreamableArchiveError('zip64 member')
+
+        has_data_descriptor = bool(flags & _FLAG_DATA_DESCRIPTOR)
+        if has_data_descriptor and compress_type == zipfile.ZIP_STORED:
+            # The end of stored data can't be found without knowing its size.
+            raise _UnstreamableArchiveError('stored member with data descriptor')
+
+        name_offset = _LOCAL_FILE_HEADER.size
+        raw_name = bytes(self._buffer[name_offset : name_offset + name_length])
+        name = raw_name.decode('utf-8' if flags & _FLAG_UTF8 else 'cp437')
+        _validate_member_name(name)
+        del self._buffer[:header_size]
+
+        member_path = self.staging_path / name
+        if name.endswith('/'):
+            # Directories can carry data too, if only an empty deflate stream.
+            member_path.mkdir(parents=True, exist_ok=True)
+            member_file = None
+        else:
+            member_path.parent.mkdir(parents=True, exist_ok=True)
+            member_file = member_path.open('wb')
+
+        self._member = _Member(
+            name,
+            member_file,
+            compress_type,
+            None if has_data_descriptor else compress_size,
+        )
+        self._expected_crc = None if has_data_descriptor else crc
+        self._state = self._read_member_data
+        return True
+
+    def _read_member_data(self) -> bool:
+        member = self._member
+        assert member
+
+        if member.remaining_compress_size is None:
+            data = bytes(self._buffer)
+            self._buffer.clear()
+        else:
+            data = bytes(self._buffer[: member.remaining_compress_size])
+            del self._buffer[: member.remaining_compress_size]
+            member.remaining_compress_size -= len(data)
+
+        if member.decompressor is None:
+            member.write(data)
+            is_member_done = member.remaining_compress_size == 0
+        else:
+            while data:
+                member.write(member.decompressor.decompress(data, _WRITE_CHUNK_SIZE))
+                data = member.decompressor.unconsumed_tail
+            is_member_done = member.decompressor.eof
+            if is_member_done:
+                member.write(member.decompressor.flush())
+                # Hand data past the end of the deflate stream back to the buffer.
+                self._buffer[:0] = member.decompressor.unused_data
+            elif member.remaining_compress_size == 0:
+                raise _UnstreamableArchiveError(f'truncated member: {member.name!r}')
+
+        if not is_member_done:
+            return False
+
+        member.close()
+        if self._expected_crc is None:
+            self._state = self._read_data_descriptor
+        else:
+            self._finish_member(self._expected_crc)
+        return True
+
+    def _read_data_descriptor(self) -> bool:
+        if len(self._buffer) < 4:
+            return False
+
+        offset = 4 if self._buffer[:4] == _DATA_DESCRIPTOR_SIGNATURE else 0
+        if len(self._buffer) < offset + _DATA_DESCRIPTOR.size:
+            return False
+
+        crc, _, _ = _DATA_DESCRIPTOR.unpack_from(self._buffer, offset)
+        del self._buffer[: offset + _DATA_DESCRIPTOR.size]
+        self._finish_member(crc)
+        return True
+
+    def _finish_member(self, expected_crc: int) -> None:
+        member = self._member
+        assert member
+
+        if member.crc != expected_crc:
+            raise _UnstreamableArchiveError(f'bad CRC for member: {member.name!r}')
+
+        if member.file:
+            self.members[member.name] = (member.crc, member.size)
+        self._member = None
+        self._state = self._read_local_file_header
+
+
+def matches_central_directory(
+    archive: zipfile.ZipFile, streamed_members: dict[str, tuple[int, int]]
+) -> bool:
+    "Check that the streamed members are exactly the files listed in the central directory."
+    return streamed_members == {
+        i.filename: (i.CRC, i.file_size) for i in archive.infolist() if not i.is_dir()
+    }
@@ -9,7 +9,7 @@ type Connection = sqlite3.Connection
 type Row = sqlite3.Row
 
 
-_VERSION = 1
+_VERSION = 4
 
 _SCHEMA = f"""
 CREATE TABLE pkg (
@@ -73,6 +73,31 @@ CREATE TABLE pkg_dep (
 );
 CREATE INDEX pkg_dep_fk ON pkg_dep (pkg_source, pkg_id);
 
+CREATE TABLE addon_toc (
+    folder_path VARCHAR NOT NULL,
+    toc_name VARCHAR NOT NULL,
+    toc_mtime_ns INTEGER NOT NULL,
+    toc_size INTEGER NOT NULL,
+    entries VARCHAR NOT NULL,
+    PRIMARY KEY (folder_path)
+);
+
+CREATE TABLE addon_fingerprint (
+    folder_path VARCHAR NOT NULL,
+    tree_signature VARCHAR NOT NULL,
+    fingerprint INTEGER NOT NULL,
+    PRIMARY KEY (folder_path)
+);
+
+CREATE TABLE addon_folder_snapshot (
+    name VARCHAR NOT NULL,
+    inode VARCHAR NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    toc_signature VARCHAR NOT NULL,
+    reconcile_outcome VARCHAR NOT NULL,
+    PRIMARY KEY (name)
+);
+
 PRAGMA user_version = {_VERSION};
 """
 
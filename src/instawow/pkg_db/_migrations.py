@@ -49,10 +49,74 @@ class _Migration_1(_BaseMigration):
         )
 
 
+class _Migration_2(_BaseMigration):
+    def upgrade(self, connection: Connection) -> None:
+        connection.execute(
+            """
+            CREATE TABLE addon_toc (
+                folder_path VARCHAR NOT NULL,
+                toc_name VARCHAR NOT NULL,
+                toc_mtime_ns INTEGER NOT NULL,
+                toc_size INTEGER NOT NULL,
+                entries VARCHAR NOT NULL,
+                PRIMARY KEY (folder_path)
+            )
+            """,
+        )
+
+    def downgrade(self, connection: Connection) -> None:
+        connection.execute(
+            'DROP TABLE addon_toc',
+        )
+
+
+class _Migration_3(_BaseMigration):
+    def upgrade(self, connection: Connection) -> None:
+        connection.execute(
+            """
+            CREATE TABLE addon_fingerprint (
+                folder_path VARCHAR NOT NULL,
+                tree_signature VARCHAR NOT NULL,
+                fingerprint INTEGER NOT NULL,
+                PRIMARY KEY (folder_path)
+            )
+            """,
+        )
+
+    def downgrade(self, connection: Connection) -> None:
+        connection.execute(
+            'DROP TABLE addon_fingerprint',
+        )
+
+
+class _Migration_4(_BaseMigration):
+    def upgrade(self, connection: Connection) -> None:
+        connection.execute(
+            """
+            CREATE TABLE addon_folder_snapshot (
+                name VARCHAR NOT NULL,
+                inode VARCHAR NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                toc_signature VARCHAR NOT NULL,
+                reconcile_outcome VARCHAR NOT NULL,
+                PRIMARY KEY (name)
+            )
+            """,
+        )
+
+    def downgrade(self, connection: Connection) -> None:
+        connection.execute(
+            'DROP TABLE addon_folder_snapshot',
+        )
+
+
 MIGRATIONS: Mapping[int, type[Migration]] = dict(
     enumerate(
         [
             _Migration_1,
+            _Migration_2,
+            _Migration_3,
+            _Migration_4,
         ],
         start=1,
     )
@@ -354,7 +354,7 @@ async def find_equivalent_pkg_defns(
 ) -> dict[Pkg, list[Defn]]:
     "Given a list of packages, find ``Defn``s of each package from other sources."
     from .catalogue import synchronise as synchronise_catalogue
-    from .matchers import AddonFolder
+    from .matchers import AddonFolder, open_toc_cache
 
     config = ctx.config.config()
     resolvers = ctx.config.resolvers()
@@ -364,15 +364,18 @@ async def find_equivalent_pkg_defns(
 
     @run_in_thread
     def collect_addon_folders():
-        return {
-            p: frozenset(
-                a
-                for f in p.folders
-                for a in (AddonFolder.from_path(flavour, config.addon_dir / f.name),)
-                if a
-            )
-            for p in pkgs
-        }
+        with open_toc_cache() as toc_cache:
+            return {
+                p: frozenset(
+                    a
+                    for f in p.folders
+                    for a in (
+                        AddonFolder.from_path(flavour, config.addon_dir / f.name, toc_cache),
+                    )
+                    if a
+                )
+                for p in pkgs
+            }
 
     def get_catalogue_defns(pkg: Pkg) -> frozenset[Defn]:
         entry = catalogue.keyed_entries.get((pkg.source, pkg.id))
@@ -622,7 +625,7 @@ async def install(
         }
 
     download_results = await gather(
-        resolvers.pkg_downloaders[d.source](d, r['download_url'])
+        resolvers.pkg_downloaders[d.source](d, r['download_url'], r.get('hashes', {}))
         for d, r in pkg_candidates.items()
     )
     archive_paths, download_errors = split_results(zip(pkg_candidates, download_results))
@@ -679,7 +682,7 @@ async def replace(
     results = results | resolve_errors
 
     download_results = await gather(
-        resolvers.pkg_downloaders[d.source](d, r['download_url'])
+        resolvers.pkg_downloaders[d.source](d, r['download_url'], r.get('hashes', {}))
         for d, r in pkg_candidates.items()
     )
     archive_paths, download_errors = split_results(zip(pkg_candidates, download_results))
@@ -763,7 +766,7 @@ async def update(
         }
 
     download_results = await gather(
-        resolvers.pkg_downloaders[d.source](d, n['download_url'])
+        resolvers.pkg_downloaders[d.source](d, n['download_url'], n.get('hashes', {}))
         for d, (_, n) in updatables.items()
     )
     archive_paths, download_errors = split_results(zip(updatables, download_results))
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import datetime as dt
 import enum
-from collections.abc import AsyncIterator, Sequence
+from collections.abc import AsyncIterator, Mapping, Sequence
 from contextlib import AbstractContextManager
 from functools import partial, wraps
 from pathlib import Path
@@ -58,6 +58,7 @@ class PkgCandidate(TypedDict):
     version: str
     changelog_url: str
     deps: NotRequired[list[_PkgCandidate_Dep]]
+    hashes: NotRequired[dict[str, str]]  # Archive hex digests keyed on ``hashlib`` algorithm
 
 
 class _PkgCandidate_Dep(TypedDict):
@@ -91,7 +92,9 @@ class Resolver[ResolveMetadataT = Never](Protocol):  # pragma: no cover
         "Reason the resolver might be disabled."
         ...
 
-    async def download_pkg_archive(self, defn: Defn, url: str) -> Path:
+    async def download_pkg_archive(
+        self, defn: Defn, url: str, hashes: Mapping[str, str] = {}
+    ) -> Path:
         "Package archive downloader."
         ...
 
@@ -149,10 +152,12 @@ class BaseResolver[ResolveMetadataT = Never](Resolver[ResolveMetadataT], Protoco
             if required and access_token is None:
                 return str(AccessTokenMissingError())
 
-    async def download_pkg_archive(self, defn: Defn, url: str) -> Path:
+    async def download_pkg_archive(
+        self, defn: Defn, url: str, hashes: Mapping[str, str] = {}
+    ) -> Path:
         from .pkg_archives._download import download_pkg_archive
 
-        return await download_pkg_archive(defn, url)
+        return await download_pkg_archive(defn, url, hashes)
 
     def open_pkg_archive(self, archive_path: Path) -> AbstractContextManager[pkg_archives.Archive]:
         return pkg_archives.open_zip_archive(archive_path)
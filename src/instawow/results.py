@@ -116,6 +116,15 @@ class PkgFilesMissing(ManagerError):
         return self._reason
 
 
+class PkgArchiveHashMismatch(ManagerError):
+    def __init__(self, algorithm: str) -> None:
+        super().__init__()
+        self.algorithm = algorithm
+
+    def __str__(self) -> str:
+        return f'downloaded archive does not match its {self.algorithm} hash'
+
+
 class PkgFilesNotMatching(ManagerError):
     def __init__(self, strategies: Strategies) -> None:
         super().__init__()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import hashlib
 import importlib.resources
 import json
 import re
@@ -34,6 +35,28 @@ def _make_addon_zip(*folders: str):
     return buffer.getvalue()
 
 
+def _with_addon_zip_hashes(value: object, *folders: str):
+    "Swap archive digests for those of the archive the mock server serves."
+    archive = _make_addon_zip(*folders)
+    digests = {1: hashlib.sha1(archive).hexdigest(), 2: hashlib.md5(archive).hexdigest()}
+
+    def replace(value: object):
+        if isinstance(value, dict):
+            return {
+                k: [{**h, 'value': digests[h['algo']]} for h in v]
+                if k == 'hashes'
+                else digests[2]
+                if k == 'UIMD5' and v
+                else replace(v)
+                for k, v in value.items()
+            }
+        elif isinstance(value, list):
+            return [replace(i) for i in value]
+        return value
+
+    return replace(value)
+
+
 ROUTES = {
     r.url.pattern: r
     for r in (
@@ -47,24 +70,39 @@ ROUTES = {
         ),
         Route(
             r'//api\.curseforge\.com/v1/mods',
-            _load_json_fixture('curse-addon--all.json'),
+            _with_addon_zip_hashes(_load_json_fixture('curse-addon--all.json'), 'Masque'),
+            method='POST',
+        ),
+        Route(
+            r'//api\.curseforge\.com/v1/fingerprints/1',
+            {
+                'data': {
+                    'isCacheBuilt': True,
+                    'exactMatches': [],
+                    'exactFingerprints': [],
+                    'partialMatches': [],
+                    'partialMatchFingerprints': {},
+                    'installedFingerprints': [],
+                    'unmatchedFingerprints': [],
+                }
+            },
             method='POST',
         ),
         Route(
             r'//api\.curseforge\.com/v1/mods/search\?gameId=1&slug=masque',
-            _load_json_fixture('curse-addon-slug-search.json'),
+            _with_addon_zip_hashes(_load_json_fixture('curse-addon-slug-search.json'), 'Masque'),
         ),
         Route(
             r'//api\.curseforge\.com/v1/mods/13592/files',
-            _load_json_fixture('curse-addon-files.json'),
+            _with_addon_zip_hashes(_load_json_fixture('curse-addon-files.json'), 'Masque'),
         ),
         Route(
             r'//api\.curseforge\.com/v1/mods/13592/files/7373575',
-            _load_json_fixture('curse-addon-file-7373575.json'),
+            _with_addon_zip_hashes(_load_json_fixture('curse-addon-file-7373575.json'), 'Masque'),
         ),
         Route(
             r'//api\.curseforge\.com/v1/mods/13592/files/7398127',
-            _load_json_fixture('curse-addon-file-7398127.json'),
+            _with_addon_zip_hashes(_load_json_fixture('curse-addon-file-7398127.json'), 'Masque'),
         ),
         Route(
             r'//api\.curseforge\.com/v1/mods/13592/files/(\d+)/changelog',
@@ -80,7 +118,7 @@ ROUTES = {
         ),
         Route(
             r'//api\.mmoui\.com/v3/game/WOW/filedetails/(\d*)\.json',
-            _load_json_fixture('wowi-filedetails.json'),
+            _with_addon_zip_hashes(_load_json_fixture('wowi-filedetails.json'), 'Masque'),
         ),
         Route(
             r'//cdn\.wowinterface\.com/.*',
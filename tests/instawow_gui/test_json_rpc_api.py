@@ -11,6 +11,7 @@ from aiohttp.test_utils import TestClient, TestServer
 from yarl import URL
 
 from instawow.config import GlobalConfig, ProfileConfig, config_converter
+from tests._fixtures.http import ROUTES, AddRoutes
 
 try:
     from instawow_gui import _json_rpc_server as json_rpc_server
@@ -107,3 +108,40 @@ async def test_install_with_invalid_params(
     rpc_response = await ws.receive_json()
     assert rpc_response['error']
     assert rpc_response['error']['code'] == -32602
+
+
+async def test_search_subscription_pushes_quick_then_final_results(
+    iw_add_routes: AddRoutes,
+    ws: ClientWebSocketResponse,
+):
+    iw_add_routes(*ROUTES.values())
+
+    def make_rpc_request(search_terms: str, id: str):
+        return {
+            'jsonrpc': '2.0',
+            'method': 'search/subscribe',
+            'params': {
+                'profile': '__default__',
+                'subscription_id': 'sub',
+                'search_terms': search_terms,
+                'limit': 20,
+                'sources': [],
+                'start_date': None,
+                'installed_only': False,
+            },
+            'id': id,
+        }
+
+    # The first query is superseded before the debounce delay elapses.
+    await ws.send_json(make_rpc_request('molinari', 'first'), dumps=dumps)
+    await ws.send_json(make_rpc_request('filleraddon1helper', 'second'), dumps=dumps)
+
+    messages = [await ws.receive_json() for _ in range(4)]
+    assert {m['id'] for m in messages if 'id' in m} == {'first', 'second'}
+
+    notifications = [m['params'] for m in messages if m.get('method') == 'search/results']
+    assert [(n['search_terms'], n['final']) for n in notifications] == [
+        ('filleraddon1helper', False),
+        ('filleraddon1helper', True),
+    ]
+    assert [len(n['results']) for n in notifications] == [10, 20]
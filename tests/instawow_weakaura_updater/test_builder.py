@@ -8,6 +8,7 @@ from yarl import URL
 from instawow import ctx, pkg_management
 from instawow.definitions import Defn
 from instawow.wow_installations import extract_installation_dir_from_addon_dir
+from instawow_weakaura_updater import _custom_slpp
 from instawow_weakaura_updater.builder import (
     _Aura,
     _generate_addon,
@@ -144,6 +145,35 @@ WeakAurasSaved = {
     ]
 
 
+def test_extracted_auras_cached_until_saved_vars_change(
+    monkeypatch: pytest.MonkeyPatch,
+    plugin_config: PluginConfig,
+    saved_vars_path: Path,
+):
+    sv_path = (saved_vars_path / _WeakAuras.name).with_suffix('.lua')
+    sv_path.write_text(
+        """\
+WeakAurasSaved = {
+    ["displays"] = {
+    },
+}
+""",
+        encoding='utf-8',
+    )
+    expected = [('Instawow', _WeakAuras, {})]
+    assert list(extract_installed_auras(plugin_config)) == expected
+
+    def loads(value: str):
+        raise AssertionError('saved variables were parsed again')
+
+    monkeypatch.setattr(_custom_slpp, 'loads', loads)
+    assert list(extract_installed_auras(plugin_config)) == expected
+
+    sv_path.write_text(sv_path.read_text(encoding='utf-8') + '\n', encoding='utf-8')
+    with pytest.raises(AssertionError, match='parsed again'):
+        list(extract_installed_auras(plugin_config))
+
+
 def test_build_addon_no_auras(
     plugin_config: PluginConfig,
 ):
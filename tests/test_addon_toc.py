@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import zipfile
 from pathlib import Path
 
 import pytest
@@ -68,3 +69,30 @@ def test_toc_version():
 
     toc_reader = TocReader('## Version: 1')
     assert toc_reader.version == '1'
+
+
+def test_parsing_stops_at_first_file_reference():
+    toc_reader = TocReader.from_bytes(
+        b'\xef\xbb\xbf## Title: Foo\r\n'
+        b'# Comment\r\n'
+        b'\r\n'
+        b'## Version: 1\r\n'
+        b'foo.lua\r\n'
+        b'## Notes: Not an entry\r\n'
+    )
+    assert dict(toc_reader) == {'Title': 'Foo', 'Version': '1'}
+
+
+def test_parsing_is_bounded(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr('instawow.matchers.addon_toc._MAX_TOC_HEADER_SIZE', 32)
+    toc_reader = TocReader.from_bytes(b'## Title: Foo\n' + b'## Notes: ' + b'x' * 32 + b'\n')
+    assert dict(toc_reader) == {'Title': 'Foo'}
+
+
+def test_loading_toc_from_zip_member(tmp_path: Path):
+    archive_path = tmp_path / 'FakeAddon.zip'
+    with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('FakeAddon/FakeAddon.toc', '## Interface: 10100\n\nfake_addon.lua\n')
+
+    with zipfile.ZipFile(archive_path) as archive, archive.open('FakeAddon/FakeAddon.toc') as file:
+        assert TocReader.from_file(file).interfaces == [10100]
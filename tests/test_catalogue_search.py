@@ -1,11 +1,21 @@
 from __future__ import annotations
 
+import asyncio
 import datetime as dt
+import sys
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
 
 import pytest
 
 from instawow import ctx, pkg_management
-from instawow.catalogue.search import search
+from instawow._utils.iteration import WeakValueDefaultDictionary
+from instawow.catalogue import _load_catalogue, keep_warm, synchronise
+from instawow.catalogue import search as catalogue_search
+from instawow.catalogue._fts_index import is_fts5_available, query_index, update_index
+from instawow.catalogue.cataloguer import CATALOGUE_VERSION, CatalogueEntry, ComputedCatalogue
+from instawow.catalogue.search import search, search_many
 from instawow.definitions import Defn
 from instawow.results import PkgInstalled
 from instawow.wow_installations import Flavour
@@ -22,6 +32,12 @@ async def test_basic_search():
     }
 
 
+@pytest.mark.parametrize('search_terms', ['masqe', 'MASQUE', 'mas', '*'])
+async def test_search_shortlist_recall(search_terms: str):
+    results = await search(search_terms, limit=200)
+    assert ('curse', 'masque') in {(e.source, e.slug) for e in results}
+
+
 @pytest.mark.parametrize(
     'iw_profile_config_values',
     [Flavour.Mainline, Flavour.VanillaClassic],
@@ -80,6 +96,135 @@ async def test_search_filter_installed():
     } == set()
 
 
+async def test_search_corpus_reused_across_queries(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    corpora = list[object]()
+
+    class RecordingSearchCorpus(catalogue_search._SearchCorpus):
+        def __init__(self, *args: Any):
+            super().__init__(*args)
+            corpora.append(self)
+
+    monkeypatch.setattr(catalogue_search, '_SearchCorpus', RecordingSearchCorpus)
+    monkeypatch.setattr(
+        catalogue_search, '_search_corpora', catalogue_search._SearchCorpusCache(2)
+    )
+
+    await search('masque', limit=5)
+    await search('molinari', limit=5)
+    assert len(corpora) == 1
+
+    await search('masque', limit=5, sources={'curse'})
+    assert len(corpora) == 2
+
+    await search('masque', limit=5)
+    assert len(corpora) == 2
+
+
+async def test_search_many_matches_search(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    queries = ['masque', 'molinari', 'atlas loot', 'wa', '*']
+    expected = [await search(q, limit=10) for q in queries]
+    assert await search_many(queries, limit=10) == expected
+
+    monkeypatch.setitem(sys.modules, 'numpy', None)
+    assert await search_many(queries, limit=10) == expected
+
+
+@pytest.mark.parametrize('numpy_available', [True, False])
+@pytest.mark.parametrize('limit', [1, 2])
+def test_search_ranking_shortlists_best_fuzzy_matches(
+    monkeypatch: pytest.MonkeyPatch,
+    limit: int,
+    numpy_available: bool,
+):
+    import rapidfuzz
+
+    if not numpy_available:
+        monkeypatch.setitem(sys.modules, 'numpy', None)
+
+    # ``mask`` is a weak match but is far more popular than the others.
+    entries = [
+        CatalogueEntry(
+            source='curse',
+            id=n,
+            slug=n,
+            name=n,
+            url=f'https://example.com/{n}',
+            game_flavours=frozenset({Flavour.Mainline}),
+            download_count=0,
+            last_updated=dt.datetime.now(dt.UTC),
+            folders=[],
+            same_as=[],
+            normalised_name=n,
+            derived_download_score=d,
+        )
+        for n, d in [
+            ('mask', 1.0),
+            ('masque', 0.1),
+            ('masquebar', 0.1),
+            ('masqueskins', 0.1),
+            ('msqe', 0.1),
+        ]
+    ]
+    entries_by_name = {e.normalised_name: [e] for e in entries}
+
+    matches = rapidfuzz.process.extract(
+        'masque',
+        list(entries_by_name),
+        scorer=rapidfuzz.fuzz.WRatio,
+        limit=limit * 2,
+        score_cutoff=70,
+    )
+    expected = [
+        e
+        for _, e in sorted(
+            (
+                (-(s / 100 * 0.5 + e.derived_download_score * 0.5), e)
+                for n, s, _ in matches
+                for e in entries_by_name[n]
+            ),
+            key=lambda v: v[0],
+        )[:limit]
+    ]
+
+    results = catalogue_search._SearchCorpus(entries_by_name).rank(
+        'masque', None, limit=limit, threshold=70
+    )
+    assert results == expected
+    assert results[0].normalised_name == 'masque'
+
+
+async def test_quick_search_scores_best_trigram_matches_only(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    shortlists = list[Sequence[str] | None]()
+
+    class RecordingSearchCorpus(catalogue_search._SearchCorpus):
+        def rank(self, search_terms: str, shortlisted_names: Sequence[str] | None, **kwargs: Any):
+            shortlists.append(shortlisted_names)
+            return super().rank(search_terms, shortlisted_names, **kwargs)
+
+    monkeypatch.setattr(catalogue_search, '_SearchCorpus', RecordingSearchCorpus)
+    monkeypatch.setattr(
+        catalogue_search, '_search_corpora', catalogue_search._SearchCorpusCache(1)
+    )
+
+    results = await search('filleraddon1helper', limit=5)
+    quick_results = await search('filleraddon1helper', limit=5, quick=True)
+    assert len(quick_results) == len(results) == 5
+    assert quick_results[0] == results[0]
+    assert quick_results[0].normalised_name == 'filleraddon1helper'
+
+    shortlist, quick_shortlist = shortlists
+    assert shortlist is not None
+    assert quick_shortlist is not None
+    assert len(quick_shortlist) <= 10 < len(shortlist)
+    assert set(quick_shortlist) < set(shortlist)
+
+
 async def test_search_prefer_known_source():
     results = await search('masque', limit=5, prefer_source=None)
     assert {('curse', 'masque'), ('github', 'sfx-wow/masque')} <= {
@@ -95,3 +240,120 @@ async def test_search_prefer_known_source():
 async def test_search_prefer_unknown_source():
     with pytest.raises(ValueError, match='Unknown preferred source: foo'):
         await search('masque', limit=5, prefer_source='foo')
+
+
+async def test_warm_catalogue_served_without_download(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    token = ctx.sync.locks.set(WeakValueDefaultDictionary[object, asyncio.Lock](asyncio.Lock))
+    try:
+        async with keep_warm():
+            catalogue = await synchronise()
+
+            async def load_catalogue(*args: object):
+                raise AssertionError('Catalogue should not be downloaded')
+
+            monkeypatch.setattr('instawow.catalogue._load_catalogue', load_catalogue)
+            assert await synchronise() is catalogue
+
+        with pytest.raises(AssertionError, match='Catalogue should not be downloaded'):
+            await synchronise()
+    finally:
+        ctx.sync.locks.reset(token)
+
+
+async def test_warm_catalogue_refreshed_ahead_of_expiry(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    refresh_intervals = list[float]()
+    refreshed = asyncio.Event()
+
+    async def sleep(delay: float):
+        refresh_intervals.append(delay)
+        if len(refresh_intervals) > 1:
+            refreshed.set()
+            await asyncio.Event().wait()
+
+    new_catalogue = ComputedCatalogue.from_base_catalogue(
+        {'version': CATALOGUE_VERSION, 'entries': []}
+    )
+    catalogues_served_during_refresh = list[ComputedCatalogue]()
+
+    async def load_catalogue(*, refresh: bool = False):
+        if not refresh:
+            return await _load_catalogue()
+
+        catalogues_served_during_refresh.append(await synchronise())
+        return (new_catalogue, dt.datetime.now(dt.UTC) + dt.timedelta(hours=4))
+
+    token = ctx.sync.locks.set(WeakValueDefaultDictionary[object, asyncio.Lock](asyncio.Lock))
+    try:
+        with monkeypatch.context() as patcher:
+            patcher.setattr(asyncio, 'sleep', sleep)
+            patcher.setattr('instawow.catalogue._load_catalogue', load_catalogue)
+
+            async with keep_warm():
+                await refreshed.wait()
+                assert await synchronise() is new_catalogue
+    finally:
+        ctx.sync.locks.reset(token)
+
+    # The previous catalogue is served until it is replaced.
+    (old_catalogue,) = catalogues_served_during_refresh
+    assert old_catalogue is not new_catalogue
+    assert old_catalogue.entries
+
+    # The catalogue is refreshed once 90% of its TTL has elapsed.
+    for refresh_interval in refresh_intervals:
+        assert (
+            dt.timedelta(hours=3.6) - dt.timedelta(minutes=1)
+            < dt.timedelta(seconds=refresh_interval)
+            <= dt.timedelta(hours=3.6)
+        )
+
+
+@pytest.mark.skipif(not is_fts5_available(), reason='FTS5 is not available')
+async def test_search_full_text_matches_slug_fragment():
+    assert ('github', 'sfx-wow/masque') not in {
+        (e.source, e.slug) for e in await search('sfx', limit=5)
+    }
+    assert ('github', 'sfx-wow/masque') in {
+        (e.source, e.slug) for e in await search('sfx', limit=5, full_text=True)
+    }
+
+
+@pytest.mark.skipif(not is_fts5_available(), reason='FTS5 is not available')
+def test_fts_index_updated_incrementally(
+    tmp_path: Path,
+):
+    def make_catalogue(*entries: tuple[str, str]):
+        return ComputedCatalogue.from_base_catalogue(
+            {
+                'version': CATALOGUE_VERSION,
+                'entries': [
+                    {
+                        'source': 'foo',
+                        'id': id,
+                        'slug': '',
+                        'name': name,
+                        'url': '',
+                        'game_flavours': ['mainline'],
+                        'download_count': 1,
+                        'last_updated': '2020-01-01T00:00:00Z',
+                        'folders': [[name.title()]],
+                        'same_as': [],
+                    }
+                    for id, name in entries
+                ],
+            }
+        )
+
+    index_path = tmp_path / 'index.sqlite'
+
+    update_index(index_path, make_catalogue(('1', 'bar'), ('2', 'baz')))
+    assert [k for k, _ in query_index(index_path, 'ba', 10)] == [('foo', '1'), ('foo', '2')]
+
+    update_index(index_path, make_catalogue(('2', 'qux'), ('3', 'bar')))
+    assert [k for k, _ in query_index(index_path, 'bar', 10)] == [('foo', '3')]
+    assert [k for k, _ in query_index(index_path, 'qux', 10)] == [('foo', '2')]
+    assert not query_index(index_path, 'baz', 10)
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import datetime as dt
+import gzip
+import json
+import os
+from collections.abc import Callable
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from instawow._utils.compression import zstd
+from instawow.catalogue.cataloguer import CATALOGUE_VERSION, collate, open_catalogue_writer
+from instawow.resolvers import CatalogueEntryCandidate
+from instawow.wow_installations import Flavour
+
+
+def _make_entry(id: str, last_updated: dt.datetime):
+    return CatalogueEntryCandidate(
+        id=id,
+        name=id,
+        url=f'https://example.com/{id}',
+        game_flavours=frozenset({Flavour.Mainline}),
+        download_count=1,
+        last_updated=last_updated,
+    )
+
+
+def _make_resolver(source: str, *entries: CatalogueEntryCandidate, fail: bool = False):
+    async def catalogue():
+        for entry in entries:
+            yield entry
+        if fail:
+            raise RuntimeError(f'{source} failed')
+
+    return SimpleNamespace(metadata=SimpleNamespace(id=source), catalogue=catalogue)
+
+
+async def test_collate_resumes_from_checkpoint(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+):
+    then = dt.datetime(2020, 1, 1, tzinfo=dt.UTC)
+    now = dt.datetime(2025, 1, 1, tzinfo=dt.UTC)
+
+    def set_resolvers(*resolvers: SimpleNamespace):
+        monkeypatch.setattr(
+            'instawow.ctx.config.resolvers', lambda: {r.metadata.id: r for r in resolvers}
+        )
+
+    set_resolvers(
+        _make_resolver('foo', _make_entry('1', then), _make_entry('2', now)),
+        _make_resolver('bar', _make_entry('3', now), fail=True),
+    )
+    with pytest.raises(RuntimeError, match='bar failed'):
+        [e async for e in collate(None, tmp_path)]
+
+    assert set(os.listdir(tmp_path)) == {'foo.jsonl', 'bar.jsonl.partial'}
+
+    set_resolvers(
+        _make_resolver('foo', fail=True),
+        _make_resolver('bar', _make_entry('3', now)),
+    )
+    entries = [e async for e in collate(now, tmp_path)]
+    assert [(e['source'], e['id']) for e in entries] == [('foo', '2'), ('bar', '3')]
+
+
+async def test_collate_resumes_partial_checkpoint(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+):
+    now = dt.datetime(2025, 1, 1, tzinfo=dt.UTC)
+
+    first_run = _make_resolver('foo', _make_entry('1', now), _make_entry('2', now), fail=True)
+    monkeypatch.setattr('instawow.ctx.config.resolvers', lambda: {'foo': first_run})
+    with pytest.raises(RuntimeError, match='foo failed'):
+        [e async for e in collate(None, tmp_path)]
+
+    second_run = _make_resolver('foo', _make_entry('2', now), _make_entry('3', now))
+    monkeypatch.setattr('instawow.ctx.config.resolvers', lambda: {'foo': second_run})
+    entries = [e async for e in collate(None, tmp_path)]
+    assert [e['id'] for e in entries] == ['1', '2', '3']
+
+
+@pytest.mark.parametrize('checkpoint_name', ['foo.jsonl', 'foo.jsonl.partial'])
+@pytest.mark.parametrize('checkpoint_age', [None, dt.timedelta(days=1)])
+async def test_collate_discards_stale_checkpoint(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    checkpoint_name: str,
+    checkpoint_age: dt.timedelta | None,
+):
+    now = dt.datetime(2025, 1, 1, tzinfo=dt.UTC)
+
+    header = (
+        json.dumps({'created_at': (dt.datetime.now(dt.UTC) - checkpoint_age).isoformat()})
+        if checkpoint_age
+        else ''
+    )
+    stale_entry = {'source': 'foo', 'id': '1', 'last_updated': now.isoformat()}
+    (tmp_path / checkpoint_name).write_text(
+        f'{header}\n{json.dumps(stale_entry)}\n', encoding='utf-8'
+    )
+
+    resolver = _make_resolver('foo', _make_entry('2', now))
+    monkeypatch.setattr('instawow.ctx.config.resolvers', lambda: {'foo': resolver})
+    entries = [e async for e in collate(None, tmp_path)]
+    assert [e['id'] for e in entries] == ['2']
+
+
+@pytest.mark.parametrize('entry_count', [0, 1, 2])
+@pytest.mark.parametrize('indent', [None, 2])
+def test_catalogue_writer_output_matches_json_dumps(
+    tmp_path: Path,
+    entry_count: int,
+    indent: int | None,
+):
+    entries = [
+        {'id': str(i), 'folders': [['A', 'B']], 'same_as': [], 'name': 'ä'}
+        for i in range(entry_count)
+    ]
+    catalogue_path = tmp_path / 'catalogue.json'
+
+    with open_catalogue_writer(catalogue_path, indent=indent) as write_entry:
+        for entry in entries:
+            write_entry(entry)
+
+    assert catalogue_path.read_text(encoding='utf-8') == json.dumps(
+        {'version': CATALOGUE_VERSION, 'entries': entries},
+        indent=indent,
+        separators=None if indent else (',', ':'),
+    )
+
+
+@pytest.mark.parametrize(
+    ('suffix', 'decompress'),
+    [
+        ('.gz', gzip.decompress),
+        pytest.param(
+            '.zst',
+            zstd and zstd.decompress,
+            marks=pytest.mark.skipif(zstd is None, reason='zstd is not available'),
+        ),
+    ],
+)
+def test_catalogue_writer_compresses(
+    tmp_path: Path,
+    suffix: str,
+    decompress: Callable[[bytes], bytes],
+):
+    catalogue_path = tmp_path / f'catalogue.json{suffix}'
+
+    with open_catalogue_writer(catalogue_path) as write_entry:
+        write_entry({'id': '1'})
+
+    assert json.loads(decompress(catalogue_path.read_bytes())) == {
+        'version': CATALOGUE_VERSION,
+        'entries': [{'id': '1'}],
+    }
@@ -3,6 +3,7 @@ from __future__ import annotations
 import importlib.util
 import json
 import shutil
+from collections.abc import Sequence
 from functools import partial
 from textwrap import dedent
 from unittest import mock
@@ -379,6 +380,84 @@ def test_reconcile_leftovers(
     )
 
 
+def test_reconcile_skipped_folders_remembered_until_changed(
+    iw_pt_input: prompt_toolkit.input.PipeInput,
+    iw_profile_config: ProfileConfig,
+):
+    pretend_install_masque(iw_profile_config)
+    iw_pt_input.send_text('sss')  # Skip
+    assert run('reconcile').exit_code == 0
+    assert run('reconcile').stdout == (
+        'No new or changed add-ons to reconcile.'
+        '  Pass `--include-skipped` to revisit add-ons which were previously skipped.\n'
+    )
+    assert run('reconcile --list-unreconciled').stdout.startswith('unreconciled')
+
+    (iw_profile_config.addon_dir / 'Masque' / 'Masque.lua').touch()
+    assert run('reconcile --auto').stdout == dedent(
+        """\
+        ✓ github:sfx-wow/masque
+          installed 11.2.10
+        """
+    )
+
+
+def test_reconcile_skipped_folders_revisited_when_toc_overwritten(
+    iw_pt_input: prompt_toolkit.input.PipeInput,
+    iw_profile_config: ProfileConfig,
+):
+    pretend_install_masque(iw_profile_config)
+    iw_pt_input.send_text('sss')  # Skip
+    assert run('reconcile').exit_code == 0
+
+    # Overwriting a file leaves the mtime of its folder alone.
+    masque_path = iw_profile_config.addon_dir / 'Masque'
+    masque_stat = masque_path.stat()
+    (masque_path / 'Masque.toc').write_text(
+        '## X-Curse-Project-ID: 13592\n## Version: 11.2.10\n', encoding='utf-8'
+    )
+    assert masque_path.stat().st_mtime_ns == masque_stat.st_mtime_ns
+
+    assert run('reconcile --auto').stdout == dedent(
+        """\
+        ✓ github:sfx-wow/masque
+          installed 11.2.10
+        """
+    )
+
+
+@pytest.mark.parametrize('failing_step', ['resolve', 'install'])
+def test_reconcile_folders_revisited_after_failure(
+    monkeypatch: pytest.MonkeyPatch,
+    iw_profile_config: ProfileConfig,
+    failing_step: str,
+):
+    from instawow import pkg_management
+    from instawow.definitions import Defn
+    from instawow.matchers import AddonFolder
+    from instawow.results import InternalError
+
+    async def match(leftovers: frozenset[AddonFolder]):
+        return [(sorted(leftovers), [Defn('github', 'sfx-wow/masque')])]
+
+    async def fail(defns: Sequence[Defn], **kwargs: object):
+        return {d: InternalError(RuntimeError('network down')) for d in defns}
+
+    monkeypatch.setattr('instawow.matchers.DEFAULT_MATCHERS', {'only': match})
+
+    pretend_install_masque(iw_profile_config)
+    with monkeypatch.context() as context:
+        context.setattr(pkg_management, failing_step, fail)
+        assert run('reconcile --auto').exit_code == 0
+
+    assert run('reconcile --auto').stdout == dedent(
+        """\
+        ✓ github:sfx-wow/masque
+          installed 11.2.10
+        """
+    )
+
+
 def test_reconcile__auto_reconcile(
     iw_profile_config: ProfileConfig,
 ):
@@ -391,6 +470,40 @@ def test_reconcile__auto_reconcile(
     )
 
 
+def test_reconcile_rematches_folders_passed_over_for_claimed_folders(
+    monkeypatch: pytest.MonkeyPatch,
+    iw_profile_config: ProfileConfig,
+):
+    from instawow.definitions import Defn
+    from instawow.matchers import AddonFolder
+
+    pretend_install_masque(iw_profile_config)
+    (iw_profile_config.addon_dir / 'Foo').mkdir()
+    (iw_profile_config.addon_dir / 'Foo' / 'Foo.toc').touch()
+
+    second_matcher_leftovers = list[set[str]]()
+
+    async def match_first(leftovers: frozenset[AddonFolder]):
+        (masque,) = (f for f in leftovers if f.name == 'Masque')
+        return [([masque], [Defn('curse', '13592')])]
+
+    async def match_second(leftovers: frozenset[AddonFolder]):
+        second_matcher_leftovers.append({f.name for f in leftovers})
+        if any(f.name == 'Masque' for f in leftovers):
+            return [(sorted(leftovers), [Defn('wowi', '12097')])]
+        return [(sorted(leftovers), [Defn('github', 'sfx-wow/masque')])]
+
+    monkeypatch.setattr(
+        'instawow.matchers.DEFAULT_MATCHERS', {'first': match_first, 'second': match_second}
+    )
+
+    stdout = run('reconcile --auto').stdout
+    assert second_matcher_leftovers == [{'Foo', 'Masque'}, {'Foo'}]
+    assert 'curse:masque' in stdout
+    assert 'github:sfx-wow/masque' in stdout
+    assert 'wowi:' not in stdout
+
+
 def test_reconcile__abort_interactive_reconciliation(
     iw_pt_input: prompt_toolkit.input.PipeInput,
     iw_profile_config: ProfileConfig,
@@ -596,3 +709,26 @@ def test_clear_cache(
     assert iw_profile_config.global_config.dirs.cache.is_dir()
     assert run('cache clear').exit_code == 0
     assert not iw_profile_config.global_config.dirs.cache.is_dir()
+
+
+def test_cache_stats_and_prune():
+    install_masque()
+
+    stats_output = run('cache stats').stdout
+    assert stats_output.splitlines()[0].split() == [
+        'host',
+        'entries',
+        'size',
+        'hits',
+        'misses',
+        'hit',
+        'rate',
+    ]
+    assert 'api.curseforge.com' in stats_output
+
+    assert run('cache prune --host api.curseforge.com').stdout.startswith(
+        'Removed 1 cache entries'
+    )
+    assert run('cache prune --host api.curseforge.com').stdout.startswith(
+        'Removed 0 cache entries'
+    )
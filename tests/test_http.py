@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+from pathlib import Path
+from unittest import mock
+
+import aiohttp.web
+import pytest
+from aiohttp_client_cache.cache_control import utcnow
+from aiohttp_client_cache.response import CachedResponse
+
+from instawow import ctx
+from instawow.config import GlobalConfig
+from instawow.http._cache import HostStats, open_cache_store
+
+from ._fixtures.http import AddRoutes, Route
+
+pytestmark = pytest.mark.usefixtures('_iw_web_client_ctx')
+
+
+@pytest.mark.parametrize(
+    ('validator_header', 'conditional_header'),
+    [
+        ('ETag', 'If-None-Match'),
+        ('Last-Modified', 'If-Modified-Since'),
+    ],
+)
+async def test_expired_response_is_revalidated(
+    monkeypatch: pytest.MonkeyPatch,
+    iw_add_routes: AddRoutes,
+    validator_header: str,
+    conditional_header: str,
+):
+    validator = 'Wed, 21 Oct 2015 07:28:00 GMT'
+    conditional_requests = list[str | None]()
+
+    async def handle_request(request: aiohttp.web.BaseRequest):
+        conditional_value = request.headers.get(conditional_header)
+        conditional_requests.append(conditional_value)
+        if conditional_value == validator:
+            return aiohttp.web.Response(status=304)
+        return aiohttp.web.Response(body=b'foo', headers={validator_header: validator})
+
+    iw_add_routes(Route(r'//example\.com/foo', handle_request))
+
+    async def get():
+        async with ctx.http.web_client().get(
+            'https://example.com/foo', expire_after=dt.timedelta(hours=1)
+        ) as response:
+            return await response.read()
+
+    assert await get() == b'foo'
+    assert await get() == b'foo'
+    assert conditional_requests == [None]
+
+    later = utcnow() + dt.timedelta(hours=2)
+    for module in ['cache_control', 'response']:
+        monkeypatch.setattr(f'aiohttp_client_cache.{module}.utcnow', lambda: later)
+
+    assert await get() == b'foo'
+    assert conditional_requests == [None, validator]
+
+    # Freshness was renewed by the 304.
+    assert await get() == b'foo'
+    assert conditional_requests == [None, validator]
+
+
+async def test_refreshed_response_freshness_renewed_before_expiry(
+    monkeypatch: pytest.MonkeyPatch,
+    iw_add_routes: AddRoutes,
+):
+    etag = '"foo"'
+    conditional_requests = list[str | None]()
+
+    async def handle_request(request: aiohttp.web.BaseRequest):
+        conditional_requests.append(request.headers.get('If-None-Match'))
+        if request.headers.get('If-None-Match') == etag:
+            return aiohttp.web.Response(status=304)
+        return aiohttp.web.Response(body=b'foo', headers={'ETag': etag})
+
+    iw_add_routes(Route(r'//example\.com/foo', handle_request))
+
+    async def get(refresh: bool = False):
+        async with ctx.http.web_client().get(
+            'https://example.com/foo', expire_after=dt.timedelta(hours=1), refresh=refresh
+        ) as response:
+            return await response.read()
+
+    assert await get() == b'foo'
+
+    later = utcnow() + dt.timedelta(minutes=50)
+    for module in ['cache_control', 'response']:
+        monkeypatch.setattr(f'aiohttp_client_cache.{module}.utcnow', lambda: later)
+
+    assert await get(refresh=True) == b'foo'
+    assert conditional_requests == [None, etag]
+
+    later += dt.timedelta(minutes=50)
+
+    # Freshness was renewed by the 304 although the response had not expired.
+    assert await get() == b'foo'
+    assert conditional_requests == [None, etag]
+
+
+async def test_response_body_is_stored_in_its_own_file(
+    iw_global_config: GlobalConfig,
+    iw_add_routes: AddRoutes,
+):
+    iw_add_routes(Route(r'//example\.com/foo', lambda: aiohttp.web.Response(body=b'foo')))
+
+    async def get():
+        async with ctx.http.web_client().get(
+            'https://example.com/foo', expire_after=dt.timedelta(hours=1)
+        ) as response:
+            return await response.read()
+
+    body_dir_path = iw_global_config.dirs.cache / '_http_v2' / 'bodies'
+
+    assert await get() == b'foo'
+    (body_path,) = body_dir_path.iterdir()
+    assert body_path.read_bytes() == b'foo'
+
+    await ctx.http.web_client().cache.clear()
+    assert not any(body_dir_path.iterdir())
+
+
+async def test_concurrent_identical_requests_are_coalesced(
+    iw_add_routes: AddRoutes,
+):
+    request_count = 0
+
+    async def handle_request(request: aiohttp.web.BaseRequest):
+        nonlocal request_count
+        request_count += 1
+        await asyncio.sleep(0.1)
+        return aiohttp.web.Response(body=b'foo')
+
+    iw_add_routes(Route(r'//example\.com/foo', handle_request))
+
+    async def get(**kwargs: object):
+        async with ctx.http.web_client().get('https://example.com/foo', **kwargs) as response:
+            return await response.read()
+
+    assert await asyncio.gather(*(get() for _ in range(3))) == [b'foo'] * 3
+    assert request_count == 3
+
+    request_count = 0
+    cache = ctx.http.web_client().cache
+    with mock.patch.object(cache, 'get_response', wraps=cache.get_response) as get_response:
+        responses = await asyncio.gather(
+            *(get(expire_after=dt.timedelta(hours=1)) for _ in range(5))
+        )
+    assert responses == [b'foo'] * 5
+    assert request_count == 1
+    # Waiting requests are handed the response without going back to the cache.
+    assert get_response.call_count == 1
+
+
+async def test_cache_lookups_are_recorded_against_request_host(
+    monkeypatch: pytest.MonkeyPatch,
+    iw_add_routes: AddRoutes,
+):
+    iw_add_routes(
+        Route(r'//example\.com/foo', lambda: aiohttp.web.Response(body=b'foo')),
+        Route(r'//example\.org/foo', lambda: aiohttp.web.Response(body=b'foo')),
+    )
+
+    lookups = list[tuple[str, bool]]()
+    monkeypatch.setattr(ctx.http.web_client().cache, 'record_lookup', lambda *a: lookups.append(a))
+
+    async def get(url: str):
+        async with ctx.http.web_client().get(url, expire_after=dt.timedelta(hours=1)) as response:
+            return await response.read()
+
+    for url in ['https://example.com/foo', 'https://example.org/foo', 'https://example.com/foo']:
+        await get(url)
+
+    assert lookups == [('example.com', False), ('example.org', False), ('example.com', True)]
+
+
+def _make_cached_response(url: str, body: bytes):
+    return CachedResponse('GET', 'OK', 200, url, '1.1', body)
+
+
+def test_cache_store_replaces_bodies(tmp_path: Path):
+    with open_cache_store(tmp_path) as store:
+        for body in [b'foo', b'bar']:
+            store.write('responses', 'key', _make_cached_response('https://example.com/', body))
+
+        response = store.read('responses', 'key')
+        assert isinstance(response, CachedResponse)
+        assert response._body == b'bar'  # pyright: ignore[reportPrivateUsage]
+        assert len(list(store.body_dir_path.iterdir())) == 1
+
+        store.write('redirects', 'other-key', 'key')
+        assert store.read('redirects', 'other-key') == 'key'
+        assert store.size('responses') == store.size('redirects') == 1
+
+
+def test_cache_store_evicts_least_recently_used_entries(tmp_path: Path):
+    with open_cache_store(tmp_path) as store:
+        for key in ['a', 'b']:
+            store.write(
+                'responses', key, _make_cached_response('https://example.com/', b'0' * 1000)
+            )
+        store.read('responses', 'a')
+
+        (host_stats,) = store.get_host_stats()
+        store.max_size = int(host_stats.size * 1.4)
+        store.write('responses', 'c', _make_cached_response('https://example.com/', b'0' * 1000))
+
+        assert sorted(store.keys('responses')) == ['a', 'c']
+        assert len(list(store.body_dir_path.iterdir())) == 2
+
+
+def test_cache_store_leaves_bodies_which_cannot_be_removed_for_prune(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+):
+    with open_cache_store(tmp_path) as store:
+        store.write('responses', 'key', _make_cached_response('https://example.com/', b'foo'))
+
+        with monkeypatch.context() as context:
+            context.setattr(Path, 'unlink', mock.Mock(side_effect=PermissionError))
+            store.delete('responses', ['key'])
+
+        assert store.keys('responses') == []
+        (body_path,) = store.body_dir_path.iterdir()
+
+        monkeypatch.setattr('instawow.http._cache._ORPHANED_BODY_GRACE_PERIOD', -1)
+        store.prune()
+        assert not body_path.exists()
+
+
+def test_cache_store_prunes_entries_by_host_and_size(tmp_path: Path):
+    with open_cache_store(tmp_path) as store:
+        for key, host in [('a', 'example.com'), ('b', 'example.org'), ('c', 'example.org')]:
+            store.write('responses', key, _make_cached_response(f'https://{host}/', b'0' * 1000))
+        store.record_lookup('example.com', True)
+        store.record_lookup('example.com', False)
+
+        entries, _ = store.prune(hosts=['example.com'])
+        assert entries == 1
+        assert sorted(store.keys('responses')) == ['b', 'c']
+
+        entries, _ = store.prune(max_size=1500)
+        assert entries == 1
+        assert store.keys('responses') == ['c']
+
+        assert store.get_host_stats() == [
+            HostStats('example.com', 0, 0, 1, 1),
+            HostStats('example.org', 1, mock.ANY, 0, 0),
+        ]
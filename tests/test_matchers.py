@@ -1,19 +1,33 @@
 from __future__ import annotations
 
+import os
+import sys
+from pathlib import Path
+
+import aiohttp.web
 import pytest
 
 from instawow import ctx
+from instawow.catalogue import synchronise as synchronise_catalogue
 from instawow.definitions import Defn
 from instawow.matchers import (
+    DEFAULT_MATCHERS,
+    NORMALISED_FLAVOUR_TOC_EXTENSIONS,
     AddonFolder,
     Matcher,
+    _get_cf_fingerprints,
     _match_addon_names_with_folder_names,
+    _match_cf_fingerprints,
     _match_folder_name_subsets,
     _match_toc_source_ids,
     get_unreconciled_folders,
+    match_all,
 )
+from instawow.matchers._cf_fingerprint import compute_folder_fingerprint, murmur2
 from instawow.wow_installations import Flavour
 
+from ._fixtures.http import AddRoutes, Route
+
 pytestmark = pytest.mark.usefixtures('_iw_config_ctx', '_iw_web_client_ctx')
 
 
@@ -62,6 +76,32 @@ async def test_reconcile_invalid_addons_discarded():
     assert await _match_folder_name_subsets(folders) == []
 
 
+async def test_flavour_suffixed_toc_preferred():
+    flavour = ctx.config.config().product['flavour']
+    addon_path = ctx.config.config().addon_dir / 'Foo'
+    addon_path.mkdir()
+    (addon_path / 'Foo.toc').write_text('## Interface: 1\n', encoding='utf-8')
+    (addon_path / f'Foo{NORMALISED_FLAVOUR_TOC_EXTENSIONS[flavour][0]}').write_text(
+        '## Interface: 2\n', encoding='utf-8'
+    )
+
+    addon_folder = AddonFolder.from_path(flavour, addon_path)
+    assert addon_folder
+    assert addon_folder.toc_reader.interfaces == [2]
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='symlinks require elevated privileges')
+async def test_reconcile_symlinked_folders_discarded(
+    tmp_path: Path,
+):
+    write_addons('foo')
+    (tmp_path / 'bar').mkdir()
+    (tmp_path / 'bar' / 'bar.toc').touch()
+    ctx.config.config().addon_dir.joinpath('bar').symlink_to(tmp_path / 'bar')
+
+    assert {a.name for a in get_unreconciled_folders()} == {'foo'}
+
+
 @pytest.mark.parametrize(
     ('test_func', 'expected_defns'),
     [
@@ -132,3 +172,189 @@ async def test_reconcile_results_vary_by_game_flavour(
     write_addons('Masque')
     ((_, matches),) = await _match_folder_name_subsets(get_unreconciled_folders())
     assert expected_defns == set(matches)
+
+
+async def test_match_all_agrees_with_matchers_run_in_sequence():
+    write_addons('AdiBags', 'AdiBags_Config')
+    write_masque_addon()
+    leftovers = get_unreconciled_folders()
+
+    results = await match_all(leftovers)
+    assert list(results) == list(DEFAULT_MATCHERS)
+    for matcher_name, matcher in DEFAULT_MATCHERS.items():
+        assert results[matcher_name] == await matcher(leftovers)
+
+
+async def test_match_all_keeps_results_of_matchers_which_did_not_fail():
+    write_masque_addon()
+    leftovers = get_unreconciled_folders()
+
+    async def fail(
+        leftovers: frozenset[AddonFolder],
+    ) -> list[tuple[list[AddonFolder], list[Defn]]]:
+        raise ValueError
+
+    results = await match_all(
+        leftovers, {'fail': fail, 'toc_source_ids': DEFAULT_MATCHERS['toc_source_ids']}
+    )
+    assert results['fail'] == []
+    assert results['toc_source_ids'] == await DEFAULT_MATCHERS['toc_source_ids'](leftovers)
+    assert results['toc_source_ids']
+
+
+async def test_folder_name_index_agrees_with_catalogue():
+    catalogue = await synchronise_catalogue()
+    for flavour, folder_names in catalogue.folder_names_by_flavour.items():
+        assert folder_names.keys() == {
+            n
+            for e in catalogue.entries
+            if flavour in e.game_flavours
+            for f in e.folders
+            for n in f
+        }
+        for name, indices in folder_names.items():
+            assert indices == sorted(indices)
+            assert all(name in catalogue.entries[i].folders[j] for i, j in indices)
+
+
+async def test_unchanged_tocs_are_read_from_cache():
+    toc_path = ctx.config.config().addon_dir / 'foo' / 'foo.toc'
+    toc_path.parent.mkdir()
+
+    def get_version():
+        (addon_folder,) = get_unreconciled_folders()
+        return addon_folder.toc_reader.version
+
+    toc_path.write_text('## Version: 1.0.0')
+    toc_stat = toc_path.stat()
+    assert get_version() == '1.0.0'
+
+    # Changing the contents without changing the size or mtime goes unnoticed.
+    toc_path.write_text('## Version: 2.0.0')
+    os.utime(toc_path, ns=(toc_stat.st_atime_ns, toc_stat.st_mtime_ns))
+    assert get_version() == '1.0.0'
+
+    toc_path.write_text('## Version: 2.0.10')
+    assert get_version() == '2.0.10'
+
+
+@pytest.mark.parametrize(
+    ('data', 'expected_hash'),
+    [
+        # Computed with the reference C implementation of MurmurHash2, seeded with 1.
+        (b'', 1540447798),
+        (b'a', 626045324),
+        (b'abc', 1621425345),
+        (b'abcd', 3376380438),
+        (b'print("foo")', 2057858739),
+        (b'The Quick\tBrown\r\nFox', 2483269647),
+    ],
+)
+def test_cf_murmur2_known_values(
+    monkeypatch: pytest.MonkeyPatch,
+    data: bytes,
+    expected_hash: int,
+):
+    assert murmur2(data) == expected_hash
+
+    monkeypatch.setitem(sys.modules, 'numpy', None)
+    assert murmur2(data) == expected_hash
+
+
+def test_cf_fingerprint_ignores_whitespace_and_unreferenced_files(
+    tmp_path: Path,
+):
+    addon_path = tmp_path / 'Foo'
+    addon_path.mkdir()
+    (addon_path / 'Foo.toc').write_text('## Title: Foo\n# Comment.lua\nfoo.lua\nLibs\\Libs.xml\n')
+    (addon_path / 'Foo.lua').write_text('print("foo")')
+    (addon_path / 'libs').mkdir()
+    (addon_path / 'libs' / 'libs.xml').write_text(
+        '<Ui><!-- <Script file="skipped.lua"/> --><Script file="lib.lua"/></Ui>'
+    )
+    (addon_path / 'libs' / 'lib.lua').write_text('print("lib")')
+    (addon_path / 'libs' / 'skipped.lua').write_text('print("skipped")')
+
+    fingerprint = compute_folder_fingerprint(str(addon_path))
+
+    (addon_path / 'Foo.lua').write_text('  print("foo")\r\n')
+    (addon_path / 'libs' / 'skipped.lua').write_text('print("still skipped")')
+    (addon_path / 'unreferenced.lua').touch()
+    assert compute_folder_fingerprint(str(addon_path)) == fingerprint
+
+    (addon_path / 'libs' / 'lib.lua').write_text('print("changed")')
+    assert compute_folder_fingerprint(str(addon_path)) != fingerprint
+
+
+@pytest.mark.parametrize('_iw_mock_aiohttp_requests', [set[str]()], indirect=True)
+async def test_reconcile_cf_fingerprints(
+    iw_add_routes: AddRoutes,
+):
+    masque_path = write_masque_addon()
+    masque_fingerprint = compute_folder_fingerprint(str(masque_path))
+    write_addons('foo')
+
+    requested_fingerprints = list[list[int]]()
+
+    async def handle_request(request: aiohttp.web.BaseRequest):
+        request_json = await request.json()
+        requested_fingerprints.append(request_json['fingerprints'])
+        return aiohttp.web.json_response(
+            {
+                'data': {
+                    'exactMatches': [
+                        {
+                            'id': 13592,
+                            'file': {'modules': [{'name': 'Masque', 'fingerprint': f}]},
+                        }
+                        for f in request_json['fingerprints']
+                        if f == masque_fingerprint
+                    ],
+                }
+            }
+        )
+
+    iw_add_routes(Route(r'//api\.curseforge\.com/v1/fingerprints/1', handle_request, 'POST'))
+
+    folders = get_unreconciled_folders()
+    ((matched_folders, defns),) = await _match_cf_fingerprints(folders)
+    assert [f.name for f in matched_folders] == ['Masque']
+    assert defns == [Defn('curse', '13592')]
+    assert len(requested_fingerprints) == 1
+    assert masque_fingerprint in requested_fingerprints[0]
+
+
+@pytest.mark.parametrize('_iw_mock_aiohttp_requests', [set[str]()], indirect=True)
+async def test_reconcile_cf_fingerprints_api_error_leaves_folders_unmatched(
+    iw_add_routes: AddRoutes,
+):
+    write_masque_addon()
+    iw_add_routes(
+        Route(
+            r'//api\.curseforge\.com/v1/fingerprints/1',
+            lambda: aiohttp.web.Response(status=403),
+            'POST',
+        )
+    )
+
+    assert await _match_cf_fingerprints(get_unreconciled_folders()) == []
+
+
+async def test_cf_fingerprints_cached_by_tree_signature():
+    toc_path = ctx.config.config().addon_dir / 'foo' / 'foo.toc'
+    toc_path.parent.mkdir()
+
+    async def get_fingerprint():
+        ((_, fingerprint),) = (await _get_cf_fingerprints(get_unreconciled_folders())).items()
+        return fingerprint
+
+    toc_path.write_text('## Version: 1.0.0')
+    toc_stat = toc_path.stat()
+    fingerprint = await get_fingerprint()
+
+    toc_path.write_text('## Version: 2.0.0')
+    os.utime(toc_path, ns=(toc_stat.st_atime_ns, toc_stat.st_mtime_ns))
+    assert await get_fingerprint() == fingerprint
+
+    toc_path.write_text('## Version: 2.0.10')
+    assert await get_fingerprint() != fingerprint
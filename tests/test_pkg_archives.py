@@ -1,10 +1,22 @@
 from __future__ import annotations
 
+import io
+import zipfile
+import zlib
+from collections.abc import Buffer
 from itertools import product
+from pathlib import Path
 
 import pytest
 
-from instawow.pkg_archives import find_archive_addon_tocs, make_archive_member_filter_fn
+from instawow.pkg_archives import (
+    find_archive_addon_tocs,
+    make_archive_member_filter_fn,
+    open_zip_archive,
+    register_streamed_archive,
+)
+from instawow.pkg_archives._mapped import _CHUNK_SIZE, MappedZipFile
+from instawow.pkg_archives._stream import StreamExtractor, matches_central_directory
 
 
 def test_find_archive_addon_tocs_can_find_explicit_dirs():
@@ -35,3 +47,184 @@ def test_find_archive_addon_tocs_toc_is_case_insensitive(ext: tuple[str, ...]):
 def test_make_archive_member_filter_fn_discards_names_with_prefix_not_in_dirs():
     is_member = make_archive_member_filter_fn({'b'})
     assert list(filter(is_member, ['a/', 'b/', 'aa/', 'bb/', 'b/c', 'a/d'])) == ['b/', 'b/c']
+
+
+class _UnseekableBuffer(io.RawIOBase):
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b: Buffer) -> int:
+        data = bytes(b)
+        self.buffer += data
+        return len(data)
+
+
+def _make_zip(
+    members: dict[str, bytes], compression: int = zipfile.ZIP_DEFLATED, seekable: bool = True
+):
+    buffer = io.BytesIO() if seekable else _UnseekableBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression) as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return bytes(buffer.getvalue() if isinstance(buffer, io.BytesIO) else buffer.buffer)
+
+
+_ZIP_MEMBERS = {
+    'a/': b'',
+    'a/a.toc': b'## Interface: 10100\n',
+    'a/b/c.lua': b'print("c")\n' * 1000,
+    'a/empty.lua': b'',
+}
+
+
+def _stream(content: bytes, staging_path: Path, chunk_size: int = 7):
+    stream_extractor = StreamExtractor(staging_path)
+    for i in range(0, len(content), chunk_size):
+        stream_extractor.feed(content[i : i + chunk_size])
+    stream_extractor.close()
+    return stream_extractor
+
+
+@pytest.mark.parametrize('compression', [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def test_stream_extractor_extracts_members(tmp_path: Path, compression: int):
+    content = _make_zip(_ZIP_MEMBERS, compression)
+    stream_extractor = _stream(content, tmp_path)
+
+    assert stream_extractor.complete
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        assert matches_central_directory(archive, stream_extractor.members)
+    for name, member_content in _ZIP_MEMBERS.items():
+        if not name.endswith('/'):
+            assert (tmp_path / name).read_bytes() == member_content
+
+
+def test_stream_extractor_reads_data_descriptors(tmp_path: Path):
+    content = _make_zip(_ZIP_MEMBERS, seekable=False)
+    stream_extractor = _stream(content, tmp_path, chunk_size=2**16)
+
+    assert stream_extractor.complete
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        assert archive.infolist()[1].flag_bits & 0x8
+        assert matches_central_directory(archive, stream_extractor.members)
+
+
+def test_stream_extractor_gives_up_on_unsafe_names(tmp_path: Path):
+    stream_extractor = _stream(_make_zip({'../a.lua': b''}), tmp_path / 'staging')
+    assert not stream_extractor.complete
+    assert not (tmp_path / 'a.lua').exists()
+
+
+def test_stream_extractor_gives_up_on_truncated_archive(tmp_path: Path):
+    content = _make_zip(_ZIP_MEMBERS)
+    assert not _stream(content[:100], tmp_path).complete
+
+
+@pytest.mark.parametrize('tamper', [False, True])
+def test_open_zip_archive_uses_streamed_members_listed_in_central_directory(
+    tmp_path: Path, tamper: bool
+):
+    archive_path = tmp_path / 'archive.zip'
+    archive_path.write_bytes(_make_zip(_ZIP_MEMBERS))
+    stream_extractor = _stream(archive_path.read_bytes(), tmp_path / 'staging')
+    (tmp_path / 'staging' / 'a' / 'a.toc').write_bytes(b'## Interface: 20200\n')
+    if tamper:
+        (tmp_path / 'staging' / 'a' / 'extra.lua').touch()
+        stream_extractor.members['a/extra.lua'] = (0, 0)
+
+    register_streamed_archive(
+        archive_path, stream_extractor.staging_path, stream_extractor.members
+    )
+    with open_zip_archive(archive_path) as (top_level_folders, extract):
+        assert top_level_folders == {'a'}
+        extract(tmp_path / 'addons')
+
+    # The staged copy is moved as is.  It is discarded in favour of the archive
+    # when it contains a member that the central directory does not list.
+    assert (tmp_path / 'addons' / 'a' / 'a.toc').read_bytes() == (
+        b'## Interface: 10100\n' if tamper else b'## Interface: 20200\n'
+    )
+    assert not (tmp_path / 'staging').exists()
+
+
+def test_open_zip_archive_does_not_escape_parent_path(tmp_path: Path):
+    archive_path = tmp_path / 'archive.zip'
+    archive_path.write_bytes(
+        _make_zip({**_ZIP_MEMBERS, 'a/../../evil/x.lua': b'', 'a/b/d.lua': b''})
+    )
+
+    with open_zip_archive(archive_path) as archive:
+        archive.extract(tmp_path / 'root' / 'addons')
+
+    assert not (tmp_path / 'root' / 'evil').exists()
+    assert (tmp_path / 'root' / 'addons' / 'a' / 'evil' / 'x.lua').exists()
+
+
+@pytest.mark.parametrize('compression', [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def test_mapped_zip_file_extracts_members_like_zip_file(tmp_path: Path, compression: int):
+    archive_path = tmp_path / 'archive.zip'
+    archive_path.write_bytes(_make_zip({**_ZIP_MEMBERS, 'a/../b.lua': b''}, compression))
+
+    with MappedZipFile(archive_path) as archive:
+        for member in archive.infolist():
+            archive.extract(member, tmp_path / 'mapped')
+
+    with zipfile.ZipFile(archive_path) as archive:
+        archive.extractall(tmp_path / 'unmapped')
+
+    def list_tree(path: Path):
+        return {(p.relative_to(path), p.is_dir() or p.read_bytes()) for p in path.rglob('*')}
+
+    assert list_tree(tmp_path / 'mapped') == list_tree(tmp_path / 'unmapped')
+
+
+def test_mapped_zip_file_inflates_members_in_bounded_chunks(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+):
+    content = b'\0' * 2**22
+    archive_path = tmp_path / 'archive.zip'
+    archive_path.write_bytes(_make_zip({'a.lua': content}))
+
+    output_sizes = list[int]()
+    decompressobj = zlib.decompressobj
+
+    class RecordingDecompressor:
+        def __init__(self, wbits: int):
+            self._decompressor = decompressobj(wbits)
+
+        def __getattr__(self, name: str):
+            return getattr(self._decompressor, name)
+
+        def decompress(self, data: Buffer, max_length: int = 0):
+            output = self._decompressor.decompress(data, max_length)
+            output_sizes.append(len(output))
+            return output
+
+    monkeypatch.setattr('zlib.decompressobj', RecordingDecompressor)
+
+    with MappedZipFile(archive_path) as archive:
+        archive.extract('a.lua', tmp_path)
+
+    assert (tmp_path / 'a.lua').read_bytes() == content
+    assert max(output_sizes) <= _CHUNK_SIZE
+
+
+def test_mapped_zip_file_verifies_member_crc(tmp_path: Path):
+    content = bytearray(_make_zip(_ZIP_MEMBERS, zipfile.ZIP_STORED))
+    content[content.index(b'## Interface')] ^= 1
+    archive_path = tmp_path / 'archive.zip'
+    archive_path.write_bytes(content)
+
+    with MappedZipFile(archive_path) as archive, pytest.raises(zipfile.BadZipFile):
+        archive.extract('a/a.toc', tmp_path)
+
+
+def test_mapped_zip_file_rejects_empty_file(tmp_path: Path):
+    archive_path = tmp_path / 'archive.zip'
+    archive_path.touch()
+
+    with pytest.raises(zipfile.BadZipFile):
+        MappedZipFile(archive_path)
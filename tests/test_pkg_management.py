@@ -1,17 +1,20 @@
 from __future__ import annotations
 
 import importlib.util
+import os
 from pathlib import Path
+from typing import Any
 
 import aiohttp
 import aiohttp.web
 import pytest
 
-from instawow import ctx, pkg_management
+from instawow import ctx, pkg_archives, pkg_management
 from instawow.definitions import Defn, Strategy
 from instawow.results import (
     InternalError,
     PkgAlreadyInstalled,
+    PkgArchiveHashMismatch,
     PkgConflictsWithInstalled,
     PkgConflictsWithUnreconciled,
     PkgInstalled,
@@ -116,6 +119,138 @@ async def test_install_can_replace_unreconciled_folders():
     assert any(masque.iterdir())
 
 
+@pytest.mark.parametrize('defn', [Defn('github', 'sfx-wow/masque'), Defn('tukui', 'tukui')])
+async def test_install_with_stream_extraction(
+    monkeypatch: pytest.MonkeyPatch,
+    defn: Defn,
+):
+    monkeypatch.setattr(ctx.config.config().global_config, 'stream_extraction', True)
+
+    streamed_archives = list[Path]()
+    register_streamed_archive = pkg_archives.register_streamed_archive
+
+    def register_streamed_archive_spy(archive_path: Path, *args: Any):
+        streamed_archives.append(archive_path)
+        register_streamed_archive(archive_path, *args)
+
+    monkeypatch.setattr(
+        'instawow.pkg_archives._download.register_streamed_archive', register_streamed_archive_spy
+    )
+
+    result = await pkg_management.install([defn], replace_folders=False)
+    assert type(result[defn]) is PkgInstalled
+    assert streamed_archives
+    assert all(
+        (ctx.config.config().addon_dir / f.name / f'{f.name}.toc').exists()
+        for f in result[defn].pkg.folders
+    )
+
+
+async def test_install_rejects_archive_not_matching_hash(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+):
+    archive_store_path = tmp_path / 'archives'
+    monkeypatch.setattr('instawow.pkg_archives._download._ARCHIVE_STORE_DIR', archive_store_path)
+
+    defn = Defn('curse', 'masque')
+
+    old_resolve = pkg_management.resolve
+
+    async def new_resolve(defns, with_deps=False):
+        result = await old_resolve(defns, with_deps)
+        pkg_candidate = result[defn]
+        assert type(pkg_candidate) is dict
+        return {defn: pkg_candidate | {'hashes': {'sha1': '0' * 40}}}
+
+    monkeypatch.setattr(pkg_management, 'resolve', new_resolve)
+
+    result = await pkg_management.install([defn], replace_folders=False)
+    assert type(result[defn]) is PkgArchiveHashMismatch
+    assert not archive_store_path.exists()
+    assert not [u async for u in ctx.http.web_client().cache.get_urls() if 'forgecdn' in str(u)]
+
+
+async def test_install_reuses_stored_archive_matching_hash(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+):
+    archive_store_path = tmp_path / 'archives'
+    monkeypatch.setattr('instawow.pkg_archives._download._ARCHIVE_STORE_DIR', archive_store_path)
+
+    defn = Defn('curse', 'masque')
+
+    result = await pkg_management.install([defn], replace_folders=False)
+    assert type(result[defn]) is PkgInstalled
+    assert len(list(archive_store_path.iterdir())) == 1
+    # Stored archives are not also kept in the HTTP cache.
+    assert not [u async for u in ctx.http.web_client().cache.get_urls() if 'forgecdn' in str(u)]
+
+    result = await pkg_management.remove([defn], keep_folders=False)
+    assert type(result[defn]) is PkgRemoved
+
+    def open_temp_writer(*args: Any):
+        raise AssertionError('archive should not have been downloaded')
+
+    monkeypatch.setattr(
+        'instawow.pkg_archives._download._open_temp_writer_async', open_temp_writer
+    )
+
+    result = await pkg_management.install([defn], replace_folders=False)
+    assert type(result[defn]) is PkgInstalled
+
+
+async def test_install_evicts_least_recently_used_stored_archives(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+):
+    archive_store_path = tmp_path / 'archives'
+    monkeypatch.setattr('instawow.pkg_archives._download._ARCHIVE_STORE_DIR', archive_store_path)
+    monkeypatch.setattr('instawow.pkg_archives._download._MAX_ARCHIVE_STORE_SIZE', 1)
+
+    archive_store_path.mkdir()
+    old_archive_path = archive_store_path / 'sha1-old'
+    old_archive_path.write_bytes(b'old')
+    os.utime(old_archive_path, (0, 0))
+    recent_archive_path = archive_store_path / 'sha1-recent'
+    recent_archive_path.write_bytes(b'recent')
+
+    defn = Defn('curse', 'masque')
+    result = await pkg_management.install([defn], replace_folders=False)
+    assert type(result[defn]) is PkgInstalled
+    assert not old_archive_path.exists()
+    assert recent_archive_path.exists()
+    assert len(list(archive_store_path.iterdir())) == 2
+
+
+async def test_install_with_downloader_not_accepting_hashes(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    resolver = ctx.config.resolvers()['curse']
+    old_download_pkg_archive = resolver.download_pkg_archive
+
+    async def download_pkg_archive(defn: Defn, url: str):
+        return await old_download_pkg_archive(defn, url)
+
+    monkeypatch.setattr(resolver, 'download_pkg_archive', download_pkg_archive)
+
+    defn = Defn('curse', 'masque')
+
+    old_resolve = pkg_management.resolve
+
+    async def new_resolve(defns, with_deps=False):
+        result = await old_resolve(defns, with_deps)
+        pkg_candidate = result[defn]
+        assert type(pkg_candidate) is dict
+        del pkg_candidate['hashes']
+        return {defn: pkg_candidate}
+
+    monkeypatch.setattr(pkg_management, 'resolve', new_resolve)
+
+    result = await pkg_management.install([defn], replace_folders=False)
+    assert type(result[defn]) is PkgInstalled
+
+
 async def test_install_cannot_replace_reconciled_folders():
     curse_defn = Defn('curse', 'masque')
     wowi_defn = Defn('wowi', '12097-masque')
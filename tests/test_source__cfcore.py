@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import re
 
+import aiohttp.web
 import pytest
 
 from instawow import ctx, pkg_management
@@ -10,6 +11,8 @@ from instawow.definitions import Defn, Strategies, Strategy
 from instawow.results import PkgFilesNotMatching
 from instawow.wow_installations import Flavour
 
+from ._fixtures.http import AddRoutes, Route
+
 pytestmark = pytest.mark.usefixtures('_iw_config_ctx', '_iw_web_client_ctx')
 
 
@@ -125,6 +128,48 @@ async def test_curse_no_stable_release_falls_back_on_pre(
     assert type(result) is dict
 
 
+async def test_catalogue_retries_failed_page(
+    monkeypatch: pytest.MonkeyPatch,
+    iw_add_routes: AddRoutes,
+    curse_resolver: CfCoreResolver,
+):
+    search_url = (
+        r'//api\.curseforge\.com/v1/mods/search\?gameId=1&sortField=\d+&sortOrder=desc&pageSize=50'
+    )
+    mod = {
+        'id': 1,
+        'slug': 'foo',
+        'name': 'Foo',
+        'links': {'websiteUrl': 'https://www.curseforge.com/wow/addons/foo'},
+        'latestFiles': [
+            {'sortableGameVersions': [{'gameVersionTypeId': 517}], 'modules': [{'name': 'Foo'}]}
+        ],
+        'downloadCount': 1,
+        'dateReleased': '2025-01-01T00:00:00Z',
+    }
+    iw_add_routes(
+        Route(
+            rf'{search_url}&index=0',
+            lambda: aiohttp.web.Response(status=503),
+            single_use=True,
+        ),
+        Route(rf'{search_url}&index=0', {'data': [mod]}),
+        Route(rf'{search_url}&index=\d+', {'data': []}),
+    )
+
+    sleeps = list[float]()
+
+    async def sleep(delay: float):
+        sleeps.append(delay)
+
+    with monkeypatch.context() as context:
+        context.setattr('asyncio.sleep', sleep)
+        entries = [e async for e in curse_resolver.catalogue()]
+
+    assert [(e['id'], e['game_flavours']) for e in entries] == [('1', {Flavour.Mainline})]
+    assert sleeps == [2]
+
+
 async def test_changelog_url_format(
     curse_resolver: CfCoreResolver,
 ):
@@ -55,6 +55,30 @@ def test_merge_intersecting_sets_in_noncontiguous_collection():
     assert sorted(merge_intersecting_sets(collection)) == output
 
 
+def test_merge_intersecting_sets_preserves_order_of_first_appearance():
+    collection = [
+        {'e'},
+        set[str](),
+        {'c', 'f'},
+        {'a'},
+        {'b', 'c'},
+        {'a', 'b'},
+    ]
+    assert list(merge_intersecting_sets(collection)) == [
+        {'e'},
+        set(),
+        {'a', 'b', 'c', 'f'},
+    ]
+
+
+def test_merge_intersecting_sets_scales_linearly():
+    # Every link in the chain is half a collection away from the next, which would
+    # take quadratic time to merge by pairwise comparison.
+    element_count = 100_000
+    collection = [{i, i + 1} for s in (1, 0) for i in range(s, element_count - 1, 2)]
+    assert list(merge_intersecting_sets(collection)) == [frozenset(range(element_count))]
+
+
 @pytest.mark.skipif(sys.platform == 'win32', reason='platform dependent')
 def test_file_uri_to_path_posix_leading_slash_is_preserved():
     uri = Path('/foo/bar').as_uri()